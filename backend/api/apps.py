@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+
+        from . import serializers, signals  # noqa: F401
+        from .profiling import (install_query_profiling,
+                                install_serializer_timing)
+
+        if settings.PROFILING:
+            connection_created.connect(install_query_profiling)
+            install_serializer_timing(serializers)
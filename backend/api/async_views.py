@@ -0,0 +1,61 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import URLPattern
+from rest_framework.permissions import SAFE_METHODS
+
+# Маршруты только для чтения данных из БД, которые под ASGI обслуживаются
+# асинхронными представлениями.
+ASYNC_READ_ROUTES = (
+    'tags-list',
+    'tags-detail',
+    'ingredients-list',
+    'ingredients-detail',
+    'recipes-detail',
+)
+
+
+def run_read_view(view, request, *args, **kwargs):
+    """Выполнение представления DRF в потоке из пула. Соединения с БД у
+       каждого потока свои, поэтому они закрываются по CONN_MAX_AGE до и
+       после запроса, как это делают сигналы request_started и
+       request_finished в основном потоке."""
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Асинхронная обертка синхронного представления DRF (в DRF 3.12 нет
+       асинхронных представлений, а ORM Django 3.2 синхронный). Под ASGI
+       Django выполняет синхронные представления по одному в общем потоке,
+       а GET-запросы через эту обертку выполняются параллельно в пуле
+       потоков. Остальные методы выполняются как обычно."""
+    read = sync_to_async(run_read_view, thread_sensitive=False)
+    write = sync_to_async(view, thread_sensitive=True)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(view, request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_read_urls(patterns, names=ASYNC_READ_ROUTES):
+    """Маршруты роутера DRF, у которых представления из names заменены
+       асинхронными обертками."""
+    return [
+        URLPattern(pattern.pattern, async_read_view(pattern.callback),
+                   pattern.default_args, pattern.name)
+        if isinstance(pattern, URLPattern) and pattern.name in names
+        else pattern
+        for pattern in patterns
+    ]
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from foodgram.constants import REFERENCE_CACHE_ALIAS
+
+
+class ReferenceCache:
+    """Версионированный кэш справочных данных (теги, ингредиенты).
+       Каждый раздел кэша имеет свою версию - время последнего изменения
+       данных в мс. Ключи записей содержат версию, поэтому для сброса
+       раздела достаточно сменить версию. Бэкенд кэша задается в
+       настройках CACHES (locmem по умолчанию, Redis и т.п. для
+       нескольких процессов/серверов)."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def version_key(namespace):
+        return f'reference:{namespace}:version'
+
+    def get_version(self, namespace):
+        """Текущая версия раздела кэша."""
+        key = self.version_key(namespace)
+        version = self.cache.get(key)
+        if version is None:
+            self.cache.add(key, int(time.time() * 1000), None)
+            version = self.cache.get(key)
+        return version
+
+    def invalidate(self, namespace):
+        """Сброс раздела кэша при изменении данных."""
+        key = self.version_key(namespace)
+        version = max(int(time.time() * 1000), self.cache.get(key, 0) + 1)
+        self.cache.set(key, version, None)
+
+    def get_key(self, namespace, key):
+        return f'reference:{namespace}:{self.get_version(namespace)}:{key}'
+
+    def delete(self, namespace, key):
+        """Удаление одной записи раздела кэша."""
+        self.cache.delete(self.get_key(namespace, key))
+
+    def get_or_set(self, namespace, key, default):
+        """Значение из кэша для текущей версии раздела. Если его нет,
+           значение вычисляется функцией default и сохраняется в кэш.
+           Возвращает значение и версию раздела."""
+        version = self.get_version(namespace)
+        cache_key = f'reference:{namespace}:{version}:{key}'
+        value = self.cache.get(cache_key)
+        if value is None:
+            value = default()
+            self.cache.set(cache_key, value)
+        return value, version
+
+
+reference_cache = ReferenceCache(REFERENCE_CACHE_ALIAS)
+
+
+class FragmentCache:
+    """Кэш готовых частей ответов API в два уровня: LRU в памяти процесса
+       на size записей и необязательный общий кэш shared_alias из CACHES.
+       Ключи должны содержать версию данных, записи не сбрасываются, а
+       вытесняются более новыми. Считает попадания и промахи для /metrics,
+       у каждого процесса свои значения."""
+
+    def __init__(self, name, size, shared_alias=None):
+        self.name = name
+        self.size = size
+        self.shared_alias = shared_alias
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def remember(self, items):
+        """Сохранение записей в памяти процесса с вытеснением давно не
+           использованных."""
+        if not self.size:
+            return
+        with self._lock:
+            for key, value in items.items():
+                self._items[key] = value
+                self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def get_many(self, keys):
+        """Найденные записи по ключам: сначала в памяти процесса, затем в
+           общем кэше."""
+        keys = set(keys)
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._items.get(key)
+                if value is not None:
+                    self._items.move_to_end(key)
+                    found[key] = value
+            self.hits['local'] += len(found)
+        missing = keys - found.keys()
+        if missing and self.shared is not None:
+            shared = self.shared.get_many(missing)
+            self.remember(shared)
+            found.update(shared)
+            with self._lock:
+                self.hits['shared'] += len(shared)
+        with self._lock:
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items):
+        self.remember(items)
+        if self.shared is not None:
+            self.shared.set_many(items)
+
+    def clear(self):
+        """Очистка кэша в памяти процесса."""
+        with self._lock:
+            self._items.clear()
+
+    def render(self):
+        """Метрики кэша в текстовом формате Prometheus."""
+        name = 'foodgram_fragment_cache_requests_total'
+        with self._lock:
+            return '\n'.join((
+                f'# HELP {name} Fragment cache lookups by cache and result.',
+                f'# TYPE {name} counter',
+                f'{name}{{cache="{self.name}",result="local_hit"}} '
+                f'{self.hits["local"]}',
+                f'{name}{{cache="{self.name}",result="shared_hit"}} '
+                f'{self.hits["shared"]}',
+                f'{name}{{cache="{self.name}",result="miss"}} {self.misses}',
+                '# HELP foodgram_fragment_cache_entries Fragment cache '
+                'entries in process memory.',
+                '# TYPE foodgram_fragment_cache_entries gauge',
+                f'foodgram_fragment_cache_entries{{cache="{self.name}"}} '
+                f'{len(self._items)}',
+            )) + '\n'
+
+
+recipe_fragments = FragmentCache(
+    'recipes', settings.RECIPE_FRAGMENTS_CACHE_SIZE,
+    settings.RECIPE_FRAGMENTS_SHARED_CACHE or None)
@@ -0,0 +1,117 @@
+import gzip
+import os
+
+from foodgram.constants import (COMPRESSION_BROTLI_QUALITY,
+                                COMPRESSION_CONTENT_TYPES,
+                                COMPRESSION_GZIP_LEVEL, COMPRESSION_MIN_SIZE,
+                                STATIC_COMPRESSION_BROTLI_QUALITY,
+                                STATIC_COMPRESSION_EXTENSIONS,
+                                STATIC_COMPRESSION_GZIP_LEVEL)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Расширения файлов, сжатых заранее, по способу сжатия.
+COMPRESSED_EXTENSIONS = {'gzip': '.gz', 'br': '.br'}
+
+
+def get_encodings():
+    """Доступные способы сжатия в порядке предпочтения."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(content, encoding, static=False):
+    """Сжатие content способом encoding. Для статических файлов - с
+       максимальной степенью сжатия, для ответов API - с быстрой."""
+    if encoding == 'br':
+        return brotli.compress(content, quality=(
+            STATIC_COMPRESSION_BROTLI_QUALITY if static
+            else COMPRESSION_BROTLI_QUALITY))
+    return gzip.compress(content, compresslevel=(
+        STATIC_COMPRESSION_GZIP_LEVEL if static else COMPRESSION_GZIP_LEVEL),
+        mtime=0)
+
+
+def parse_accept_encoding(header):
+    """Способы сжатия из заголовка Accept-Encoding и их веса (q)."""
+    weights = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        if not coding:
+            continue
+        weight = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip() == 'q':
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    return weights
+
+
+def get_accepted_encoding(header):
+    """Способ сжатия ответа для заголовка Accept-Encoding клиента или
+       None, если клиент не принимает сжатые ответы."""
+    weights = parse_accept_encoding(header)
+    accepted = [
+        encoding for encoding in get_encodings()
+        if weights.get(encoding, weights.get('*', 0)) > 0]
+    if not accepted:
+        return None
+    return max(accepted, key=lambda encoding: weights.get(
+        encoding, weights.get('*', 0)))
+
+
+def is_compressible(content_type, size):
+    """Сжимаются только текстовые типы данных не меньше
+       COMPRESSION_MIN_SIZE байт: сжатие маленьких ответов и уже сжатых
+       форматов (картинки, PDF) не уменьшает объем."""
+    media_type = content_type.split(';')[0].strip().lower()
+    return size >= COMPRESSION_MIN_SIZE and media_type.startswith(
+        COMPRESSION_CONTENT_TYPES)
+
+
+def precompress_file(path):
+    """Сохранение сжатых копий файла рядом с ним (file.js.gz, file.js.br)
+       для отдачи nginx без сжатия на каждый запрос (gzip_static). Копия
+       не сохраняется, если она не меньше исходного файла, и не
+       пересоздается, если файл не менялся. Возвращает размер файла и
+       размеры сжатых копий."""
+    size = os.path.getsize(path)
+    compressed = {}
+    if (not path.endswith(STATIC_COMPRESSION_EXTENSIONS)
+            or size < COMPRESSION_MIN_SIZE):
+        return size, compressed
+    content = None
+    for encoding in get_encodings():
+        compressed_path = path + COMPRESSED_EXTENSIONS[encoding]
+        if (os.path.exists(compressed_path) and os.path.getmtime(
+                compressed_path) >= os.path.getmtime(path)):
+            compressed[encoding] = os.path.getsize(compressed_path)
+            continue
+        if content is None:
+            with open(path, 'rb') as file:
+                content = file.read()
+        data = compress(content, encoding, static=True)
+        if len(data) >= size:
+            continue
+        with open(compressed_path, 'wb') as file:
+            file.write(data)
+        compressed[encoding] = len(data)
+    return size, compressed
+
+
+def precompress_directory(root):
+    """Сжатые копии всех подходящих файлов каталога root. Возвращает
+       словарь путь файла: (размер, размеры сжатых копий)."""
+    results = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(tuple(COMPRESSED_EXTENSIONS.values())):
+                continue
+            path = os.path.join(directory, name)
+            results[path] = precompress_file(path)
+    return results
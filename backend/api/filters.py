@@ -1,25 +1,57 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework
-from rest_framework.filters import SearchFilter
+from rest_framework.filters import BaseFilterBackend
 
-from recipes.models import Recipe, Tag
+from foodgram.constants import INGREDIENTS_SEARCH_LIMIT
+from recipes.models import Recipe, RecipeTag, Tag
+from .cache import reference_cache
+from .search import search_ingredients, search_recipes
 
 
-class IngredientsFilter(SearchFilter):
-    """Кастомная настройка фильтра для Ингридиентов."""
+def get_tag_ids():
+    """Соответствие slug тега его id из кэша справочных данных."""
+    tag_ids, _ = reference_cache.get_or_set(
+        'tags', 'slug_ids',
+        lambda: dict(Tag.objects.exclude(slug=None).values_list('slug', 'id')))
+    return tag_ids
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in get_tag_ids()]
+
+
+class IngredientsFilter(BaseFilterBackend):
+    """Кастомная настройка фильтра для Ингридиентов: автодополнение по
+       названию, сначала совпадения по началу названия, затем по вхождению."""
     search_param = 'name'
 
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term or view.detail:
+            return queryset
+        return search_ingredients(queryset, term, INGREDIENTS_SEARCH_LIMIT)
+
 
 class RecipesFilter(rest_framework.FilterSet):
     """Кастомная настройка фильтра для Рецептов."""
     author = rest_framework.CharFilter(field_name='author')
-    tags = rest_framework.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all())
+    tags = rest_framework.MultipleChoiceFilter(
+        choices=get_tag_choices,
+        method='filter_tags')
     is_favorited = rest_framework.NumberFilter(
         method='filter_is_favorited')
     is_in_shopping_cart = rest_framework.NumberFilter(
         method='filter_is_in_shopping_cart')
+    search = rest_framework.CharFilter(method='filter_search')
+
+    def filter_tags(self, queryset, name, value):
+        """Фильтрует рецепты с любым из указанных тегов подзапросом EXISTS,
+           без JOIN и дублей рецептов. Тег, удаленный после проверки
+           значения, пропускается."""
+        tag_ids = get_tag_ids()
+        return queryset.filter(Exists(RecipeTag.objects.filter(
+            recipe=OuterRef('pk'),
+            tags__in=[tag_ids[slug] for slug in value if slug in tag_ids])))
 
     def filter_is_favorited(self, queryset, name, value):
         """Фильтрует избранные рецепты пользователя."""
@@ -33,6 +65,12 @@ class RecipesFilter(rest_framework.FilterSet):
             return queryset.filter(shoppingcarts__user=self.request.user)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию, описанию, тегам и
+           ингредиентам рецепта, результаты отсортированы по релевантности."""
+        return search_recipes(queryset, value)
+
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'search')
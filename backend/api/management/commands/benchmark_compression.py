@@ -0,0 +1,96 @@
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from api.compression import compress, get_encodings, is_compressible
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает объем и время ответов API без сжатия и со сжатием '
+            'gzip/brotli (CompressionMiddleware): страница рецептов, '
+            'рецепт и список всех ингредиентов. Время ответа - время '
+            'обработки запроса приложением и передачи ответа по каналу '
+            '--bandwidth Мбит/с. Для файлов из --static выводятся размеры '
+            'сжатых копий.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Кол-во рецептов на странице.')
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Кол-во повторов каждого запроса.')
+        parser.add_argument(
+            '--bandwidth', type=float, default=10,
+            help='Пропускная способность канала клиента в Мбит/с.')
+        parser.add_argument(
+            '--static', nargs='*', default=[],
+            help='Статические файлы, например сборка фронтенда и '
+                 'docs/redoc.html.')
+
+    def get_host(self):
+        hosts = [host for host in settings.ALLOWED_HOSTS
+                 if host and '*' not in host]
+        return hosts[0].lstrip('.') if hosts else 'localhost'
+
+    def measure(self, client, url, encoding, repeat):
+        """Размер ответа и медиана времени его получения в мс."""
+        client.get(url, HTTP_HOST=self.get_host(),
+                   HTTP_ACCEPT_ENCODING=encoding)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(url, HTTP_HOST=self.get_host(),
+                                  HTTP_ACCEPT_ENCODING=encoding)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: статус {response.status_code}.')
+        if response.get('Content-Encoding', 'identity') != encoding:
+            raise CommandError(f'{url}: ответ не сжат {encoding}, проверьте '
+                               f'RESPONSE_COMPRESSION.')
+        return len(response.content), statistics.median(timings)
+
+    def report_static(self, paths):
+        """Размеры файлов со сжатием, как при collectstatic."""
+        self.stdout.write('\nСтатические файлы:')
+        for path in paths:
+            with open(path, 'rb') as file:
+                content = file.read()
+            sizes = ', '.join(
+                f'{encoding} {len(compress(content, encoding, static=True))}'
+                f' байт' for encoding in get_encodings())
+            if not is_compressible('text/', len(content)):
+                sizes = 'не сжимается (меньше COMPRESSION_MIN_SIZE)'
+            self.stdout.write(
+                f'{os.path.basename(path)}: {len(content)} байт, {sizes}')
+
+    def handle(self, *args, **options):
+        recipe_id = Recipe.objects.order_by('-id').values_list(
+            'id', flat=True).first()
+        if recipe_id is None:
+            raise CommandError('Нет рецептов, сгенерируйте данные командой '
+                               'generate_fake_data.')
+        scenarios = (
+            ('recipes_list', f'/api/recipes/?limit={options["recipes"]}'),
+            ('recipe_detail', f'/api/recipes/{recipe_id}/'),
+            ('ingredients', '/api/ingredients/'),
+        )
+        # Байт в мс при пропускной способности канала в Мбит/с.
+        bytes_per_ms = options['bandwidth'] * 1000 / 8
+        client = Client()
+        for name, url in scenarios:
+            for encoding in ('identity', *reversed(get_encodings())):
+                size, duration = self.measure(client, url, encoding,
+                                              options['repeat'])
+                transfer = size / bytes_per_ms
+                self.stdout.write(
+                    f'{name} {encoding}: {size} байт, приложение '
+                    f'{duration:.2f} мс, передача {transfer:.2f} мс, '
+                    f'всего {duration + transfer:.2f} мс')
+        if options['static']:
+            self.report_static(options['static'])
@@ -0,0 +1,85 @@
+import io
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import ORJSONParser, ORJSONRenderer, orjson
+from api.serializers import GetRecipeSerializer, IngredientSerializer
+from recipes.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает скорость JSONRenderer/JSONParser DRF и '
+            'ORJSONRenderer/ORJSONParser на ответах API из БД: страница '
+            'рецептов, рецепт и список всех ингредиентов. Совместимость '
+            'ответов проверяют тесты api/tests/test_renderers.py.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Кол-во рецептов на странице.')
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Кол-во повторов каждого замера.')
+
+    def get_host(self):
+        hosts = [host for host in settings.ALLOWED_HOSTS
+                 if host and '*' not in host]
+        return hosts[0].lstrip('.') if hosts else 'localhost'
+
+    def get_payloads(self, recipes_count):
+        request = Request(APIRequestFactory().get(
+            '/api/recipes/', HTTP_HOST=self.get_host()))
+        context = {'request': request}
+        recipes = list(Recipe.objects.with_related().with_user_flags(
+            request.user).order_by('-id')[:recipes_count])
+        if not recipes:
+            raise CommandError('Нет рецептов, сгенерируйте данные командой '
+                               'generate_fake_data.')
+        return (
+            ('recipes_page', GetRecipeSerializer(
+                recipes, many=True, context=context).data),
+            ('recipe_detail', GetRecipeSerializer(
+                recipes[0], context=context).data),
+            ('ingredients', IngredientSerializer(
+                Ingredient.objects.all(), many=True).data),
+        )
+
+    def measure(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def report(self, title, standard, fast):
+        self.stdout.write(
+            f'{title}: json {standard:.3f} мс, orjson {fast:.3f} мс, '
+            f'ускорение {standard / fast:.1f}x')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson не установлен, ORJSONRenderer '
+                               'работает через стандартный модуль json.')
+        payloads = self.get_payloads(options['recipes'])
+        repeat = options['repeat']
+        for name, data in payloads:
+            content = JSONRenderer().render(data)
+            self.stdout.write(f'{name}: {len(content)} байт')
+            self.report(
+                f'{name} рендеринг',
+                self.measure(lambda: JSONRenderer().render(data), repeat),
+                self.measure(lambda: ORJSONRenderer().render(data), repeat))
+            self.report(
+                f'{name} разбор',
+                self.measure(lambda: JSONParser().parse(
+                    io.BytesIO(content)), repeat),
+                self.measure(lambda: ORJSONParser().parse(
+                    io.BytesIO(content)), repeat))
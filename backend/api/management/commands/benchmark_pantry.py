@@ -0,0 +1,87 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from api.pantry import PantryIndex
+from foodgram.constants import PANTRY_RESULTS_LIMIT
+from recipes.models import Recipe, RecipeIngredient
+
+
+def match_with_orm(ingredient_ids, limit):
+    """Наивный подбор: GROUP BY по ингредиентам рецептов на каждый
+       запрос."""
+    return list(Recipe.objects.annotate(
+        matched=Count('recipeingredients', filter=Q(
+            recipeingredients__ingredients__in=ingredient_ids)),
+        total=Count('recipeingredients'),
+    ).filter(matched__gt=0).annotate(
+        coverage=Cast('matched', FloatField()) / Cast('total', FloatField()),
+        missing=F('total') - F('matched'),
+    ).order_by('-coverage', 'missing', '-id').values_list(
+        'id', flat=True)[:limit])
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает скорость подбора рецептов по продуктам через '
+            'индекс в памяти и через запрос GROUP BY к БД.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queries', type=int, default=50,
+            help='Кол-во случайных наборов продуктов.')
+        parser.add_argument(
+            '--ingredients', type=int, default=8,
+            help='Кол-во продуктов в наборе.')
+        parser.add_argument(
+            '--limit', type=int, default=PANTRY_RESULTS_LIMIT,
+            help='Кол-во рецептов в результате.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def report(self, title, timings):
+        self.stdout.write(
+            f'{title}: медиана {statistics.median(timings):.2f} мс, '
+            f'p95 {percentile(timings, 95):.2f} мс')
+
+    def handle(self, *args, **options):
+        used_ingredients = list(RecipeIngredient.objects.order_by(
+            'ingredients_id').values_list(
+                'ingredients_id', flat=True).distinct())
+        if not used_ingredients:
+            self.stdout.write('Нет рецептов с ингредиентами.')
+            return
+        generator = random.Random(options['seed'])
+        pantries = [
+            generator.sample(used_ingredients, min(
+                options['ingredients'], len(used_ingredients)))
+            for _ in range(options['queries'])]
+        index = PantryIndex()
+        started = time.perf_counter()
+        state = index.get_state()
+        self.stdout.write(
+            f'Построение индекса: {len(state.sizes)} рецептов, '
+            f'{(time.perf_counter() - started) * 1000:.0f} мс')
+        index_timings, orm_timings, same = [], [], 0
+        for pantry in pantries:
+            started = time.perf_counter()
+            matches = index.match(pantry, options['limit'])
+            index_timings.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            expected = match_with_orm(pantry, options['limit'])
+            orm_timings.append((time.perf_counter() - started) * 1000)
+            same += [match.recipe_id for match in matches] == expected
+        self.report('Индекс в памяти', index_timings)
+        self.report('Запрос GROUP BY', orm_timings)
+        speedup = (statistics.median(orm_timings)
+                   / statistics.median(index_timings))
+        self.stdout.write(
+            f'Ускорение по медиане: {speedup:.1f}x, '
+            f'совпадение результатов: {same}/{len(pantries)}')
@@ -0,0 +1,192 @@
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from recipes.models import Ingredient, Recipe
+from .run_benchmarks import percentile
+
+MODES = ('sync', 'gthread', 'uvicorn')
+
+
+def get_scenarios():
+    """URL сценариев: асинхронные под ASGI представления (теги,
+       ингредиенты, рецепт) и синхронный список рецептов для сравнения."""
+    recipe_id = Recipe.objects.order_by('-id').values_list(
+        'id', flat=True).first()
+    if recipe_id is None:
+        raise CommandError('Нет рецептов, сгенерируйте данные командой '
+                           'generate_fake_data.')
+    ingredient = Ingredient.objects.order_by('id').values_list(
+        'name', flat=True).first() or ''
+    return (
+        ('tags', '/api/tags/'),
+        ('ingredients_search',
+         '/api/ingredients/?' + urlencode({'name': ingredient[:3]})),
+        ('recipe_detail', f'/api/recipes/{recipe_id}/'),
+        ('recipes_list', '/api/recipes/'),
+    )
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность gunicorn в режимах sync, '
+            'gthread и uvicorn (см. gunicorn.conf.py): для каждого режима '
+            'запускается сервер и нагружается параллельными keep-alive '
+            'соединениями. Нагрузка создается потоками этого же процесса, '
+            'поэтому для честного сравнения запускайте сервер и команду на '
+            'разных процессорах или ограничьте кол-во воркеров.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='*', choices=MODES,
+                            default=list(MODES))
+        parser.add_argument(
+            '--duration', type=float, default=5,
+            help='Длительность нагрузки на сценарий в секундах.')
+        parser.add_argument(
+            '--concurrency', type=int, default=32,
+            help='Кол-во одновременных соединений.')
+        parser.add_argument(
+            '--workers', type=int,
+            help='Кол-во воркеров gunicorn (GUNICORN_WORKERS), по '
+                 'умолчанию как в gunicorn.conf.py.')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--output', help='Файл для результатов в JSON.')
+
+    def get_host(self):
+        hosts = [host for host in settings.ALLOWED_HOSTS
+                 if host and '*' not in host]
+        return hosts[0].lstrip('.') if hosts else 'localhost'
+
+    def start_server(self, mode, port, workers):
+        # Без перезапуска воркеров по max_requests во время замера.
+        env = dict(os.environ, GUNICORN_WORKER_CLASS=mode,
+                   GUNICORN_BIND=f'127.0.0.1:{port}',
+                   GUNICORN_MAX_REQUESTS='0')
+        if workers:
+            env['GUNICORN_WORKERS'] = str(workers)
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'{mode}: gunicorn завершился с кодом '
+                                   f'{server.returncode}.')
+            try:
+                connection = http.client.HTTPConnection(
+                    '127.0.0.1', port, timeout=1)
+                connection.request('GET', '/api/tags/',
+                                   headers={'Host': self.get_host()})
+                connection.getresponse().read()
+                connection.close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        self.stop_server(server)
+        raise CommandError(f'{mode}: gunicorn не запустился за 30 с.')
+
+    def stop_server(self, server):
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    def load(self, port, url, duration, concurrency):
+        """Нагрузка url в concurrency соединений в течение duration
+           секунд. Каждое соединение отправляет следующий запрос сразу
+           после ответа на предыдущий."""
+        durations, statuses = [], Counter()
+        lock = threading.Lock()
+        headers = {'Host': self.get_host()}
+        deadline = time.monotonic() + duration
+
+        def run():
+            local_durations, local_statuses = [], Counter()
+            connection = http.client.HTTPConnection('127.0.0.1', port,
+                                                    timeout=30)
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', url, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    local_statuses[response.status] += 1
+                except (OSError, http.client.HTTPException):
+                    local_statuses['error'] += 1
+                    connection.close()
+                    continue
+                local_durations.append(time.perf_counter() - started)
+            connection.close()
+            with lock:
+                durations.extend(local_durations)
+                statuses.update(local_statuses)
+
+        threads = [threading.Thread(target=run) for _ in range(concurrency)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        if not durations:
+            return {'rps': 0, 'statuses': dict(statuses)}
+        return {
+            'rps': round(len(durations) / elapsed, 1),
+            'mean_ms': round(statistics.mean(durations) * 1000, 2),
+            'p50_ms': round(percentile(durations, 50) * 1000, 2),
+            'p99_ms': round(percentile(durations, 99) * 1000, 2),
+            'statuses': {str(status): count
+                         for status, count in statuses.items()},
+        }
+
+    def handle(self, *args, **options):
+        scenarios = get_scenarios()
+        results = {}
+        for mode in options['modes']:
+            server = self.start_server(mode, options['port'],
+                                       options['workers'])
+            try:
+                results[mode] = {}
+                for name, url in scenarios:
+                    self.load(options['port'], url, 1,
+                              options['concurrency'])
+                    result = self.load(options['port'], url,
+                                       options['duration'],
+                                       options['concurrency'])
+                    results[mode][name] = result
+                    self.stdout.write(
+                        f'{mode} {name}: {result["rps"]} запр./с, '
+                        f'p50 {result.get("p50_ms")} мс, '
+                        f'p99 {result.get("p99_ms")} мс, '
+                        f'статусы {result["statuses"]}')
+            finally:
+                self.stop_server(server)
+        self.stdout.write('\nЗапросов в секунду:')
+        self.stdout.write('{:<20}'.format('') + ''.join(
+            f'{mode:>10}' for mode in results))
+        for name, _ in scenarios:
+            self.stdout.write(f'{name:<20}' + ''.join(
+                f'{results[mode][name]["rps"]:>10}' for mode in results))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'created': timezone.now().isoformat(),
+                    'concurrency': options['concurrency'],
+                    'duration': options['duration'],
+                    'workers': options['workers'],
+                    'results': results,
+                }, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты сохранены в {options["output"]}')
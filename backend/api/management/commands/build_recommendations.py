@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import reference_cache
+from api.recommendations import build_neighbors
+from foodgram.constants import (RECOMMENDATIONS_BATCH_SIZE,
+                                RECOMMENDATIONS_NEIGHBORS)
+from recipes.models import RecipeNeighbor
+
+BULK_CREATE_BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = ('Строит таблицу похожих рецептов для рекомендаций по избранному, '
+            'спискам покупок, ингредиентам и тегам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--neighbors', type=int, default=RECOMMENDATIONS_NEIGHBORS,
+            help='Кол-во похожих рецептов для каждого рецепта.')
+        parser.add_argument(
+            '--batch-size', type=int, default=RECOMMENDATIONS_BATCH_SIZE,
+            help='Кол-во рецептов в одном блоке расчета.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = 0
+        with transaction.atomic():
+            RecipeNeighbor.objects.all().delete()
+            batch = []
+            for recipe_id, neighbor_id, score in build_neighbors(
+                    options['neighbors'], options['batch_size']):
+                batch.append(RecipeNeighbor(
+                    recipe_id=recipe_id, neighbor_id=neighbor_id,
+                    score=score))
+                if len(batch) == BULK_CREATE_BATCH_SIZE:
+                    RecipeNeighbor.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            RecipeNeighbor.objects.bulk_create(batch)
+            created += len(batch)
+        reference_cache.invalidate('recommendations')
+        self.stdout.write(
+            f'Сохранено похожих рецептов: {created}, '
+            f'{time.perf_counter() - started:.1f} с')
@@ -0,0 +1,35 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.compression import get_encodings, precompress_directory
+
+
+class Command(BaseCommand):
+    help = ('Сохраняет рядом с файлами каталогов их сжатые копии (.gz и '
+            '.br) для отдачи nginx без сжатия на каждый запрос '
+            '(gzip_static). Статика Django сжимается при collectstatic, '
+            'команда нужна для сборки фронтенда и документации API.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help='Каталоги, по умолчанию STATIC_ROOT.')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or [settings.STATIC_ROOT]
+        for path in paths:
+            if not os.path.isdir(path):
+                raise CommandError(f'Каталог {path} не найден.')
+            results = precompress_directory(path)
+            compressed = {name: sizes for name, (_, sizes)
+                          in results.items() if sizes}
+            total = sum(results[name][0] for name in compressed)
+            self.stdout.write(
+                f'{path}: сжато файлов {len(compressed)} из '
+                f'{len(results)}, {total} байт')
+            for encoding in get_encodings():
+                size = sum(sizes.get(encoding, results[name][0])
+                           for name, sizes in compressed.items())
+                self.stdout.write(f'  {encoding}: {size} байт')
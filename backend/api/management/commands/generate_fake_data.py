@@ -0,0 +1,193 @@
+import io
+import random
+import time
+import uuid
+from itertools import accumulate
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from api.cache import reference_cache
+from api.pantry import invalidate_pantry_index
+from api.search import update_search_vectors
+from recipes.models import (FavoriteRecipes, Ingredient, Recipe,
+                            RecipeIngredient, RecipeTag, ShoppingCart, Tag)
+from users.models import Subscribers, User
+
+PLACEHOLDER_IMAGE = 'recipes_images/fake_recipe.jpg'
+
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+WORDS = (
+    'суп', 'салат', 'пирог', 'омлет', 'каша', 'рагу', 'паста', 'запеканка',
+    'блины', 'котлеты', 'плов', 'соус', 'домашний', 'быстрый', 'острый',
+    'сливочный', 'овощной', 'куриный', 'грибной', 'сырный', 'летний',
+    'постный', 'праздничный', 'бабушкин', 'с медом', 'с чесноком',
+    'с зеленью', 'по-деревенски', 'в духовке', 'на сковороде',
+)
+
+
+def power_law_weights(count, exponent):
+    """Накопленные веса степенного распределения: элемент с рангом k
+       выбирается с вероятностью, пропорциональной 1 / k^exponent."""
+    return list(accumulate(1 / (rank ** exponent)
+                           for rank in range(1, count + 1)))
+
+
+def get_placeholder_image():
+    """Общая картинка для всех сгенерированных рецептов."""
+    if not default_storage.exists(PLACEHOLDER_IMAGE):
+        buffer = io.BytesIO()
+        Image.new('RGB', (480, 480), (226, 108, 45)).save(buffer, 'JPEG')
+        default_storage.save(PLACEHOLDER_IMAGE,
+                             ContentFile(buffer.getvalue()))
+    return PLACEHOLDER_IMAGE
+
+
+class Command(BaseCommand):
+    help = ('Генерирует тестовые данные для нагрузочного тестирования: '
+            'пользователей, рецепты, избранное, списки покупок и подписки. '
+            'Популярность авторов и рецептов распределена по степенному '
+            'закону. Ингредиенты должны быть загружены заранее.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites', type=float, default=20,
+            help='Среднее кол-во рецептов в избранном у пользователя.')
+        parser.add_argument(
+            '--cart', type=float, default=5,
+            help='Среднее кол-во рецептов в списке покупок.')
+        parser.add_argument(
+            '--subscriptions', type=float, default=5,
+            help='Среднее кол-во подписок у пользователя.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def bulk_create(self, model, objects):
+        model.objects.bulk_create(
+            objects, batch_size=self.batch_size, ignore_conflicts=True)
+
+    def sample_count(self, mean):
+        """Кол-во связей пользователя: распределение Парето с заданным
+           средним, у немногих пользователей связей намного больше."""
+        shape = 1.5
+        return int(self.random.paretovariate(shape)
+                   * mean * (shape - 1) / shape)
+
+    def create_users(self, count):
+        run = uuid.uuid4().hex[:8]
+        self.bulk_create(User, (
+            User(username=f'user_{run}_{number}',
+                 email=f'user_{run}_{number}@example.com',
+                 first_name='Тест',
+                 last_name=f'Пользователь {number}',
+                 password='!')
+            for number in range(count)))
+        return list(User.objects.filter(
+            username__startswith=f'user_{run}_').values_list('id', flat=True))
+
+    def create_recipes(self, authors, count, tag_ids, ingredient_ids):
+        image = get_placeholder_image()
+        authors = self.random.sample(authors, len(authors))
+        ingredient_ids = self.random.sample(
+            ingredient_ids, len(ingredient_ids))
+        author_weights = power_law_weights(len(authors), 1.1)
+        ingredient_weights = power_law_weights(len(ingredient_ids), 0.9)
+        first_id = Recipe.objects.order_by('-id').values_list(
+            'id', flat=True).first() or 0
+        recipes = []
+        for _ in range(count):
+            recipes.append(Recipe(
+                author_id=self.random.choices(
+                    authors, cum_weights=author_weights)[0],
+                name=' '.join(self.random.sample(WORDS, 3)).capitalize(),
+                text=' '.join(self.random.choices(WORDS, k=30)),
+                cooking_time=self.random.randint(5, 180),
+                image=image))
+        self.bulk_create(Recipe, recipes)
+        recipe_ids = list(Recipe.objects.filter(
+            id__gt=first_id, image=image).values_list('id', flat=True))
+        recipe_tags, recipe_ingredients = [], []
+        for recipe_id in recipe_ids:
+            for tag_id in self.random.sample(
+                    tag_ids, self.random.randint(1, min(3, len(tag_ids)))):
+                recipe_tags.append(RecipeTag(recipe_id=recipe_id,
+                                             tags_id=tag_id))
+            for ingredient_id in set(self.random.choices(
+                    ingredient_ids, cum_weights=ingredient_weights,
+                    k=self.random.randint(3, 15))):
+                recipe_ingredients.append(RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredients_id=ingredient_id,
+                    amount=self.random.randint(1, 500)))
+        self.bulk_create(RecipeTag, recipe_tags)
+        self.bulk_create(RecipeIngredient, recipe_ingredients)
+        return recipe_ids
+
+    def create_links(self, model, users, targets, field, mean, exponent):
+        """Связи пользователей с рецептами или авторами: кол-во связей
+           пользователя по Парето, выбор рецепта/автора по степенному
+           закону."""
+        weights = power_law_weights(len(targets), exponent)
+        targets = self.random.sample(targets, len(targets))
+        links = []
+        for user_id in users:
+            for target_id in set(self.random.choices(
+                    targets, cum_weights=weights,
+                    k=min(self.sample_count(mean), len(targets)))):
+                if field == 'author_id' and target_id == user_id:
+                    continue
+                links.append(model(user_id=user_id, **{field: target_id}))
+        self.bulk_create(model, links)
+        return len(links)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError('Сначала загрузите ингредиенты!')
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS)
+            reference_cache.invalidate('tags')
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        started = time.perf_counter()
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            self.stdout.write(f'Пользователей: {len(users)}')
+            recipe_ids = self.create_recipes(
+                users, options['recipes'], tag_ids, ingredient_ids)
+            self.stdout.write(f'Рецептов: {len(recipe_ids)}')
+            if recipe_ids:
+                for model, mean, name in (
+                        (FavoriteRecipes, options['favorites'],
+                         'Избранное'),
+                        (ShoppingCart, options['cart'], 'Списки покупок')):
+                    created = self.create_links(
+                        model, users, recipe_ids, 'recipe_id', mean, 0.8)
+                    self.stdout.write(f'{name}: {created}')
+            created = self.create_links(
+                Subscribers, users, users, 'author_id',
+                options['subscriptions'], 1.1)
+            self.stdout.write(f'Подписки: {created}')
+            for start in range(0, len(recipe_ids), self.batch_size):
+                update_search_vectors(
+                    recipe_ids[start:start + self.batch_size])
+        call_command('recount_counters', stdout=self.stdout)
+        invalidate_pantry_index()
+        reference_cache.invalidate('recommendations')
+        self.stdout.write(
+            f'Готово за {time.perf_counter() - started:.1f} с. Для '
+            'рекомендаций запустите build_recommendations.')
@@ -0,0 +1,209 @@
+import csv
+import io
+import json
+import re
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.cache import reference_cache
+from foodgram.constants import TEXT_MAX_LENGTH
+from recipes.models import Ingredient
+
+JSON_CHUNK_SIZE = 1 << 16
+JSON_SEPARATORS = re.compile(r'[\s,]*')
+
+CREATE_IMPORT_TABLE_SQL = f"""
+CREATE TEMP TABLE ingredient_import (
+    name varchar({TEXT_MAX_LENGTH}),
+    measurement_unit varchar({TEXT_MAX_LENGTH})
+)
+"""
+
+UPSERT_SQL = """
+WITH upserted AS (
+    INSERT INTO {table} (name, measurement_unit)
+    SELECT name, measurement_unit FROM ingredient_import
+    ON CONFLICT (name) DO UPDATE
+    SET measurement_unit = EXCLUDED.measurement_unit
+    WHERE {table}.measurement_unit <> EXCLUDED.measurement_unit
+    RETURNING xmax = 0 AS inserted
+)
+SELECT count(*) FILTER (WHERE inserted), count(*) FROM upserted
+"""
+
+
+def read_csv(file):
+    """Строки (название, единица измерения) из CSV. Колонки ищутся по
+       заголовку name, measurement_unit, без заголовка берутся две
+       последние колонки строки."""
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if header is None:
+        return
+    fields = [field.strip().lower() for field in header]
+    if 'name' in fields and 'measurement_unit' in fields:
+        name_index = fields.index('name')
+        unit_index = fields.index('measurement_unit')
+        rows = reader
+    else:
+        name_index, unit_index = -2, -1
+        rows = (row for rows in ([header], reader) for row in rows)
+    for row in rows:
+        if len(row) < 2:
+            yield None, None
+        else:
+            yield row[name_index], row[unit_index]
+
+
+def read_json(file):
+    """Объекты из JSON-массива, файл читается частями без загрузки
+       целиком в память."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив объектов.')
+    position, finished = 1, False
+    while True:
+        position = JSON_SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if finished:
+                raise CommandError('Некорректный JSON.')
+            chunk = file.read(JSON_CHUNK_SIZE)
+            finished = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item
+
+
+def read_json_lines(file):
+    """Объекты из JSON Lines, по одному на строку."""
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_objects(items):
+    for item in items:
+        if isinstance(item, dict):
+            yield item.get('name'), item.get('measurement_unit')
+        else:
+            yield None, None
+
+
+def clean_row(name, measurement_unit):
+    """Строка без лишних пробелов или None, если она не проходит
+       ограничения модели."""
+    if not isinstance(name, str) or not isinstance(measurement_unit, str):
+        return None
+    name, measurement_unit = name.strip(), measurement_unit.strip()
+    if (not name or not measurement_unit
+            or len(name) > TEXT_MAX_LENGTH
+            or len(measurement_unit) > TEXT_MAX_LENGTH):
+        return None
+    return name, measurement_unit
+
+
+class Command(BaseCommand):
+    help = ('Загружает ингредиенты из CSV, JSON или JSON Lines пачками. '
+            'Новые ингредиенты добавляются, у существующих с тем же '
+            'названием обновляется единица измерения. Файл читается '
+            'потоково, поэтому размер каталога не ограничен памятью.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу с ингредиентами.')
+        parser.add_argument(
+            '--format', choices=('csv', 'json', 'jsonl'),
+            help='Формат файла, по умолчанию - по расширению.')
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def get_rows(self, file, file_format):
+        if file_format == 'csv':
+            return read_csv(file)
+        if file_format == 'json':
+            return read_objects(read_json(file))
+        return read_objects(read_json_lines(file))
+
+    def upsert_copy(self, rows):
+        """Загрузка пачки в PostgreSQL: COPY во временную таблицу и один
+           INSERT ... ON CONFLICT. Кол-во добавленных и обновленных строк."""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows.items())
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_IMPORT_TABLE_SQL)
+            cursor.copy_expert(
+                'COPY ingredient_import (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)', buffer)
+            cursor.execute(UPSERT_SQL.format(
+                table=connection.ops.quote_name(Ingredient._meta.db_table)))
+            inserted, changed = cursor.fetchone()
+            cursor.execute('DROP TABLE ingredient_import')
+        return inserted, changed - inserted
+
+    def upsert_generic(self, rows):
+        """Загрузка пачки в остальные БД: один запрос существующих
+           ингредиентов, затем executemany для новых и изменившихся строк
+           без создания объектов моделей."""
+        existing = dict(Ingredient.objects.filter(
+            name__in=list(rows)).values_list('name', 'measurement_unit'))
+        new, updated = [], []
+        for name, measurement_unit in rows.items():
+            if name not in existing:
+                new.append((name, measurement_unit))
+            elif existing[name] != measurement_unit:
+                updated.append((measurement_unit, name))
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'VALUES (%s, %s)', new)
+            cursor.executemany(
+                f'UPDATE {table} SET measurement_unit = %s '
+                'WHERE name = %s', updated)
+        return len(new), len(updated)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if file_format not in ('csv', 'json', 'jsonl'):
+            raise CommandError('Не удалось определить формат файла, '
+                               'укажите --format.')
+        upsert = (self.upsert_copy if connection.vendor == 'postgresql'
+                  else self.upsert_generic)
+        inserted = updated = skipped = 0
+        started = time.perf_counter()
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as file:
+                rows = self.get_rows(file, file_format)
+                while True:
+                    batch = list(islice(rows, options['batch_size']))
+                    if not batch:
+                        break
+                    cleaned = {}
+                    for row in batch:
+                        row = clean_row(*row)
+                        if row is not None:
+                            cleaned[row[0]] = row[1]
+                    skipped += len(batch) - len(cleaned)
+                    if not cleaned:
+                        continue
+                    with transaction.atomic():
+                        batch_inserted, batch_updated = upsert(cleaned)
+                    inserted += batch_inserted
+                    updated += batch_updated
+                    skipped += len(cleaned) - batch_inserted - batch_updated
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Ошибка чтения {path}: {error}')
+        if inserted or updated:
+            reference_cache.invalidate('ingredients')
+        self.stdout.write(
+            f'Добавлено: {inserted}, обновлено: {updated}, '
+            f'пропущено: {skipped} '
+            f'за {time.perf_counter() - started:.1f} с.')
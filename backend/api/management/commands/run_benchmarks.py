@@ -0,0 +1,229 @@
+import json
+import random
+import statistics
+import time
+from collections import Counter
+from contextlib import ExitStack
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from foodgram.constants import DEFAULT_PAGES_LIMIT
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+SEARCH_WORDS = ('суп', 'салат', 'пирог', 'курица', 'сыр', 'мед', 'грибы')
+
+
+class BenchmarkData:
+    """Данные БД для построения случайных запросов сценариев."""
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.recipe_ids = list(Recipe.objects.order_by('?').values_list(
+            'id', flat=True)[:1000])
+        self.author_ids = list(User.objects.filter(
+            recipes_count__gt=0).order_by('-recipes_count').values_list(
+                'id', flat=True)[:100])
+        self.tag_slugs = list(Tag.objects.exclude(slug=None).values_list(
+            'slug', flat=True))
+        self.ingredient_prefixes = sorted({
+            name[:3] for name in Ingredient.objects.values_list(
+                'name', flat=True)[:1000]})
+        self.last_page = max(
+            1, Recipe.objects.count() // DEFAULT_PAGES_LIMIT)
+
+    def choice(self, values, default=''):
+        return self.random.choice(values) if values else default
+
+    def tags(self):
+        slugs = self.random.sample(
+            self.tag_slugs, min(len(self.tag_slugs), 2))
+        return urlencode([('tags', slug) for slug in slugs])
+
+
+SCENARIOS = (
+    ('recipes_list', False,
+     lambda data: '/api/recipes/'),
+    ('recipes_list_deep_page', False,
+     lambda data: '/api/recipes/?' + urlencode(
+         {'page': data.random.randint(1, data.last_page)})),
+    ('recipes_filter_tags', False,
+     lambda data: f'/api/recipes/?{data.tags()}'),
+    ('recipes_filter_author', False,
+     lambda data: f'/api/recipes/?author={data.choice(data.author_ids)}'),
+    ('recipes_favorited', True,
+     lambda data: '/api/recipes/?is_favorited=1'),
+    ('recipes_search', False,
+     lambda data: '/api/recipes/?' + urlencode(
+         {'search': data.choice(SEARCH_WORDS)})),
+    ('recipe_detail', False,
+     lambda data: f'/api/recipes/{data.choice(data.recipe_ids, 0)}/'),
+    ('subscriptions', True,
+     lambda data: '/api/users/subscriptions/?recipes_limit=3'),
+    ('shopping_cart_download', True,
+     lambda data: '/api/recipes/download_shopping_cart/'),
+    ('ingredients_search', False,
+     lambda data: '/api/ingredients/?' + urlencode(
+         {'name': data.choice(data.ingredient_prefixes)})),
+)
+
+
+def percentile(values, percent):
+    """Процентиль методом ближайшего ранга."""
+    values = sorted(values)
+    rank = max(0, int(round(percent / 100 * len(values))) - 1)
+    return values[min(rank, len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время ответа основных эндпоинтов API через тестовый '
+            'клиент Django (в процессе, без сети): p50/p95/p99 и кол-во '
+            'SQL-запросов. Результаты сохраняются в JSON для сравнения '
+            'между релизами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='Кол-во запросов на сценарий.')
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Кол-во запросов прогрева, не входят в результаты.')
+        parser.add_argument(
+            '--scenarios', nargs='*',
+            choices=[name for name, _, _ in SCENARIOS],
+            help='Запустить только указанные сценарии.')
+        parser.add_argument(
+            '--user', type=int,
+            help='id пользователя для сценариев с авторизацией, по '
+                 'умолчанию - пользователь с самым большим списком покупок.')
+        parser.add_argument(
+            '--output',
+            help='Файл для результатов в JSON, по умолчанию '
+                 'benchmark-<дата и время>.json.')
+        parser.add_argument(
+            '--compare',
+            help='JSON с результатами прошлого запуска для сравнения.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def get_user(self, user_id):
+        users = User.objects.all()
+        if user_id is None:
+            users = users.annotate(
+                cart_size=Count('shoppingcarts')).order_by('-cart_size')
+        else:
+            users = users.filter(id=user_id)
+        user = users.first()
+        if user is None:
+            raise CommandError('Нет пользователя для сценариев с '
+                               'авторизацией, сгенерируйте данные '
+                               'командой generate_fake_data.')
+        return user
+
+    def get_client(self, token=None):
+        hosts = [host for host in settings.ALLOWED_HOSTS
+                 if host and '*' not in host]
+        defaults = {'HTTP_HOST': hosts[0].lstrip('.') if hosts
+                    else 'localhost'}
+        if token is not None:
+            defaults['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+        return Client(**defaults)
+
+    def request(self, client, url):
+        with ExitStack() as stack:
+            contexts = [stack.enter_context(CaptureQueriesContext(db))
+                        for db in connections.all()]
+            started = time.perf_counter()
+            response = client.get(url)
+            duration = (time.perf_counter() - started) * 1000
+        return (response.status_code, duration,
+                sum(len(context) for context in contexts))
+
+    def run_scenario(self, client, build_url, data, requests, warmup):
+        for _ in range(warmup):
+            self.request(client, build_url(data))
+        statuses, durations, queries = Counter(), [], []
+        for _ in range(requests):
+            status, duration, count = self.request(client, build_url(data))
+            statuses[status] += 1
+            durations.append(duration)
+            queries.append(count)
+        return {
+            'example_url': build_url(data),
+            'statuses': dict(statuses),
+            'mean_ms': round(statistics.mean(durations), 2),
+            'p50_ms': round(percentile(durations, 50), 2),
+            'p95_ms': round(percentile(durations, 95), 2),
+            'p99_ms': round(percentile(durations, 99), 2),
+            'max_ms': round(max(durations), 2),
+            'queries_p50': percentile(queries, 50),
+            'queries_max': max(queries),
+        }
+
+    def compare(self, results, path):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)['scenarios']
+        self.stdout.write(f'\nСравнение с {path}:')
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            changes = []
+            for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+                before = baseline[name][key]
+                change = (result[key] - before) / before * 100 if before else 0
+                changes.append(f'{key} {before} -> {result[key]} '
+                               f'({change:+.0f}%)')
+            queries = (f'запросов {baseline[name]["queries_p50"]} -> '
+                       f'{result["queries_p50"]}')
+            self.stdout.write(f'{name}: {", ".join(changes)}, {queries}')
+
+    def handle(self, *args, **options):
+        if not Recipe.objects.exists():
+            raise CommandError('Нет рецептов, сгенерируйте данные командой '
+                               'generate_fake_data.')
+        user = self.get_user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        anonymous_client = self.get_client()
+        user_client = self.get_client(token)
+        data = BenchmarkData(options['seed'])
+        selected = options['scenarios']
+        results = {}
+        for name, authenticated, build_url in SCENARIOS:
+            if selected and name not in selected:
+                continue
+            result = self.run_scenario(
+                user_client if authenticated else anonymous_client,
+                build_url, data, options['requests'], options['warmup'])
+            results[name] = result
+            self.stdout.write(
+                f'{name}: p50 {result["p50_ms"]} мс, '
+                f'p95 {result["p95_ms"]} мс, p99 {result["p99_ms"]} мс, '
+                f'запросов {result["queries_p50"]} '
+                f'(макс. {result["queries_max"]}), '
+                f'статусы {result["statuses"]}')
+        report = {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'data': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'ingredients': Ingredient.objects.count(),
+            },
+            'user_id': user.id,
+            'requests': options['requests'],
+            'scenarios': results,
+        }
+        output = options['output'] or (
+            f'benchmark-{timezone.now():%Y%m%d-%H%M%S}.json')
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты сохранены в {output}')
+        if options['compare']:
+            self.compare(results, options['compare'])
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram.db_router import (RequestRouting, current_routing, get_replicas,
+                                mark_primary_sticky)
+
+from .compression import compress, get_accepted_encoding, is_compressible
+from .profiling import (QueryBudgetExceeded, RequestProfile, current_profile,
+                        metrics_registry)
+
+logger = logging.getLogger(__name__)
+
+
+def get_view_label(request, view_func):
+    """Название действия API: ViewSet.action, например
+       RecipesViewSet.list или CustomUserViewSet.subscriptions."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+class ProfilingMiddleware:
+    """Замер кол-ва и времени SQL-запросов, времени сериализации и общего
+       времени запроса по действиям API. Результаты добавляются в заголовок
+       Server-Timing и в метрики /metrics. Если действие выполнило больше
+       SQL-запросов, чем указано в QUERY_BUDGETS, в лог пишется
+       предупреждение, а при QUERY_BUDGET_MODE = 'raise' выбрасывается
+       исключение (для тестов). Работает и под WSGI, и под ASGI без
+       переключения потоков."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Как в django.utils.deprecation.MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.PROFILING:
+            return self.get_response(request)
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.process_profile(request, response, profile, started)
+
+    async def __acall__(self, request):
+        if not settings.PROFILING:
+            return await self.get_response(request)
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.process_profile(request, response, profile, started)
+
+    def process_profile(self, request, response, profile, started):
+        duration = time.perf_counter() - started
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return response
+        profile.label = get_view_label(request, resolver_match.func)
+        budget = settings.QUERY_BUDGETS.get(profile.label)
+        budget_exceeded = budget is not None and profile.queries > budget
+        metrics_registry.observe(profile, request.method,
+                                 response.status_code, duration,
+                                 budget_exceeded)
+        response['Server-Timing'] = ', '.join((
+            f'db;desc="{profile.queries} queries";'
+            f'dur={profile.db_time * 1000:.1f}',
+            f'serialize;dur={profile.serializer_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ))
+        if budget_exceeded:
+            message = (f'{profile.label}: {profile.queries} SQL-запросов '
+                       f'при лимите {budget}')
+            if settings.QUERY_BUDGET_MODE == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжатие ответов brotli (если установлен пакет Brotli) или gzip по
+       заголовку Accept-Encoding клиента. Сжимаются только ответы
+       текстовых типов не меньше COMPRESSION_MIN_SIZE байт. Отключается
+       настройкой RESPONSE_COMPRESSION, тогда ответы сжимает nginx."""
+
+    def __init__(self, get_response):
+        if not settings.RESPONSE_COMPRESSION:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_response(self, request, response):
+        if (response.streaming or response.has_header('Content-Encoding')
+                or not is_compressible(response.get('Content-Type', ''),
+                                       len(response.content))):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = get_accepted_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        content = compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # Сжатый ответ побайтно отличается от исходного, как в
+        # django.middleware.gzip.GZipMiddleware.
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^"', 'W/"', response['ETag'])
+        return response
+
+
+class DatabaseRoutingMiddleware:
+    """Выбор БД для чтения в запросе (ReplicaRouter): GET-запросы читают
+       из реплик, остальные - из основной БД. После успешного изменения
+       данных пользователем его запросы некоторое время читают из основной
+       БД. Без реплик в настройках не используется."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = current_routing.set(RequestRouting(
+            request, primary=request.method not in SAFE_METHODS))
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        return self.process_writes(request, response)
+
+    async def __acall__(self, request):
+        token = current_routing.set(RequestRouting(
+            request, primary=request.method not in SAFE_METHODS))
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        return self.process_writes(request, response)
+
+    def process_writes(self, request, response):
+        user = getattr(request, 'user', None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and user is not None and user.is_authenticated):
+            mark_primary_sticky(user)
+        return response
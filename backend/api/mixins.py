@@ -0,0 +1,147 @@
+import hashlib
+
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+from .cache import reference_cache
+from .renderers import ORJSONRenderer
+
+
+class ReferenceCacheMixin:
+    """Отдача справочных данных из кэша в виде готового JSON с поддержкой
+       условных запросов (ETag/Last-Modified, ответ 304)."""
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request,
+                                        *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request,
+                                        *args, **kwargs)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        def render():
+            content = ORJSONRenderer().render(
+                handler(request, *args, **kwargs).data)
+            return content, quote_etag(hashlib.md5(content).hexdigest())
+
+        key = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        (content, etag), version = reference_cache.get_or_set(
+            self.cache_namespace, key, render)
+        last_modified = version // 1000
+        response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return get_conditional_response(request, etag=etag,
+                                        last_modified=last_modified,
+                                        response=response)
+
+
+class ConditionalGetMixin:
+    """Условные запросы (ETag, ответ 304) для списка и отдельных
+       объектов. ETag считается по полям etag_fields легким запросом без
+       сериализации, поэтому если данные не изменились, сериализатор не
+       запускается. В ETag входят и признаки текущего пользователя, ответы
+       анонимам можно кэшировать в nginx (Cache-Control: public), ответы
+       пользователям - только в браузере с обязательной проверкой
+       (private, no-cache). Last-Modified отдается только анонимам для
+       отдельных объектов: время изменения объекта не меняется при
+       изменении признаков пользователя (избранное, список покупок,
+       подписка) и состава страницы списка, и ответ 304 на
+       If-Modified-Since вернул бы устаревшие данные."""
+    etag_fields = ('pk',)
+    etag_namespaces = ()
+    etag_version = 1
+    vary_headers = ('Authorization',)
+    cache_max_age = 0
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.paginate_queryset(self.get_etag_queryset(queryset))
+        envelope = None
+        if rows is None:
+            rows = list(self.get_etag_queryset(queryset))
+        else:
+            envelope = self.paginator.get_paginated_response([]).data
+        etag = self.get_etag(request, rows, envelope)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            objects = queryset.in_bulk([row['pk'] for row in rows])
+            serializer = self.get_serializer(
+                [objects[row['pk']] for row in rows if row['pk'] in objects],
+                many=True)
+            response = (Response(serializer.data) if envelope is None
+                        else self.get_paginated_response(serializer.data))
+        return self.patch_cache_headers(request, response, etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            self.get_etag_queryset(self.filter_queryset(self.get_queryset())),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        etag = self.get_etag(request, [row])
+        last_modified = self.get_last_modified(request, [row])
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return self.patch_cache_headers(request, response, etag,
+                                        last_modified)
+
+    def get_etag_queryset(self, queryset):
+        return queryset.prefetch_related(None).values(*self.etag_fields)
+
+    def get_etag(self, request, rows, envelope=None):
+        """ETag ответа по полям объектов, версиям разделов кэша справочных
+           данных etag_namespaces, пользователю, адресу сайта (ссылки в
+           ответе абсолютные) и данным пагинации."""
+        user = request.user
+        payload = (
+            self.etag_version,
+            request.build_absolute_uri('/'),
+            user.pk if user.is_authenticated else None,
+            self.get_versions(),
+            envelope,
+            [tuple(row.values()) for row in rows],
+        )
+        return quote_etag(hashlib.md5(repr(payload).encode()).hexdigest())
+
+    def get_versions(self):
+        return [reference_cache.get_version(namespace)
+                for namespace in self.etag_namespaces]
+
+    def get_last_modified(self, request, rows):
+        """Время изменения (Last-Modified) ответа анониму по полю
+           modified_at объектов и версиям разделов кэша справочных данных,
+           для пользователей - None."""
+        if request.user.is_authenticated:
+            return None
+        return int(max(
+            [row['modified_at'].timestamp() for row in rows
+             if row.get('modified_at')]
+            + [version / 1000 for version in self.get_versions()] or [0]))
+
+    def patch_cache_headers(self, request, response, etag,
+                            last_modified=None):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, self.vary_headers)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True,
+                                max_age=self.cache_max_age)
+        return response
@@ -1,9 +1,87 @@
-from rest_framework.pagination import PageNumberPagination
+from django.db import connections
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
-from foodgram.constants import DEFAULT_PAGES_LIMIT
+from foodgram.constants import (DEFAULT_PAGES_LIMIT, PAGINATION_MODE_HEADER,
+                                PAGINATION_MODE_PARAM)
+
+
+class KeysetPagination(CursorPagination):
+    """Курсорная пагинация: стоимость страницы не зависит от ее номера,
+       общее кол-во записей не считается, если не запрошено параметром
+       count (exact - точное, approximate - оценка по статистике БД)."""
+    page_size_query_param = 'limit'
+    page_size = DEFAULT_PAGES_LIMIT
+    count_query_param = 'count'
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == 'approximate':
+            self.count = self.get_approximate_count(queryset)
+        elif count_mode == 'exact':
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_approximate_count(self, queryset):
+        """Оценка кол-ва записей из pg_class.reltuples для выборки без
+           фильтров, в остальных случаях - точный подсчет."""
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class '
+                    'WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] > 0:
+                return row[0]
+        return queryset.count()
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data['count'] = self.count
+        return response
 
 
 class Pagination(PageNumberPagination):
-    """Кастомная пагинация для Рецептов и Пользователей."""
+    """Кастомная пагинация для Рецептов и Пользователей. По умолчанию
+       постраничная, курсорная включается параметром pagination=cursor
+       или заголовком X-Pagination: cursor. Порядок записей для курсорной
+       пагинации задается атрибутом cursor_ordering вьюсета, параметры
+       запроса, задающие свой порядок (например, сортировка поиска по
+       релевантности), - атрибутом ranked_query_params: с курсорной
+       пагинацией они не сочетаются."""
     page_size_query_param = 'limit'
     page_size = DEFAULT_PAGES_LIMIT
+    cursor_ordering = ('-id',)
+
+    def is_cursor_mode(self, request):
+        return (
+            request.query_params.get(PAGINATION_MODE_PARAM) == 'cursor'
+            or request.headers.get(PAGINATION_MODE_HEADER) == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_pagination = None
+        if self.is_cursor_mode(request):
+            for param in getattr(view, 'ranked_query_params', ()):
+                if request.query_params.get(param):
+                    raise ValidationError({
+                        'errors': f'Параметр {param} не поддерживается '
+                                  f'курсорной пагинацией, используйте '
+                                  f'постраничную.'})
+            self.keyset_pagination = KeysetPagination(
+                getattr(view, 'cursor_ordering', self.cursor_ordering))
+            return self.keyset_pagination.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_pagination is not None:
+            return self.keyset_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
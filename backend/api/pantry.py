@@ -0,0 +1,253 @@
+import threading
+import time
+from collections import defaultdict, namedtuple
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+
+from foodgram.constants import (PANTRY_CHANGES_TIMEOUT,
+                                PANTRY_INDEX_REBUILD_INTERVAL,
+                                PANTRY_MAX_PENDING_CHANGES)
+from recipes.models import RecipeIngredient
+from .cache import reference_cache
+
+CHANGES_KEY = 'pantry:changes'
+
+PantryMatch = namedtuple(
+    'PantryMatch', ('recipe_id', 'matched', 'total', 'missing'))
+
+
+def record_recipe_change(recipe_id):
+    """Запись id измененного рецепта в журнал изменений в кэше справочных
+       данных. Журнал читают индексы всех процессов, чтобы обновить
+       только изменившиеся рецепты."""
+    cache = reference_cache.cache
+    cache.add(CHANGES_KEY, 0, None)
+    try:
+        number = cache.incr(CHANGES_KEY)
+    except ValueError:
+        number = 1
+        cache.set(CHANGES_KEY, number, None)
+    cache.set(f'{CHANGES_KEY}:{number}', recipe_id, PANTRY_CHANGES_TIMEOUT)
+
+
+def schedule_recipe_change(recipe_id):
+    """Запись изменения рецепта после фиксации транзакции."""
+    transaction.on_commit(lambda: record_recipe_change(recipe_id))
+
+
+def invalidate_pantry_index():
+    """Полная перестройка индексов всех процессов, например после
+       массовой загрузки рецептов без сигналов."""
+    record_recipe_change(None)
+
+
+def read_changes(since, last):
+    """Id рецептов, измененных после записи журнала since. None, если
+       изменений слишком много, часть записей уже вытеснена из кэша или
+       запрошена полная перестройка - тогда индекс строится заново."""
+    if last < since or last - since > PANTRY_MAX_PENDING_CHANGES:
+        return None
+    keys = [f'{CHANGES_KEY}:{number}' for number in range(since + 1, last + 1)]
+    changes = reference_cache.cache.get_many(keys)
+    changes = set(changes.values()) if len(changes) == len(keys) else None
+    if changes is None or None in changes:
+        return None
+    return changes
+
+
+class PantryIndexState:
+    """Снимок индекса. Рецепты пронумерованы позициями: сначала рецепты
+       из полной сборки по возрастанию id, затем добавленные позже.
+       Ингредиенты рецептов хранятся в CSR-виде (indptr, indices),
+       изменившиеся после сборки - в словаре overrides. Для каждого
+       ингредиента хранится массив позиций рецептов с ним (postings),
+       для каждого рецепта - кол-во его ингредиентов (sizes)."""
+
+    def __init__(self, recipe_ids, base_count, extra_positions, sizes,
+                 indptr, indices, overrides, postings, change_number,
+                 built_at):
+        self.recipe_ids = recipe_ids
+        self.base_count = base_count
+        self.extra_positions = extra_positions
+        self.sizes = sizes
+        self.indptr = indptr
+        self.indices = indices
+        self.overrides = overrides
+        self.postings = postings
+        self.change_number = change_number
+        self.built_at = built_at
+
+    def get_position(self, recipe_id):
+        position = np.searchsorted(
+            self.recipe_ids[:self.base_count], recipe_id)
+        if (position < self.base_count
+                and self.recipe_ids[position] == recipe_id):
+            return int(position)
+        return self.extra_positions.get(recipe_id)
+
+    def get_ingredients(self, position):
+        if position in self.overrides:
+            return self.overrides[position]
+        return self.indices[self.indptr[position]:self.indptr[position + 1]]
+
+
+class PantryIndex:
+    """Обратный индекс ингредиент -> рецепты в памяти процесса для подбора
+       рецептов по имеющимся продуктам. Кол-во совпавших ингредиентов
+       для всех рецептов считается одним np.bincount по спискам рецептов
+       выбранных ингредиентов, без запросов к БД. Изменения рецептов
+       применяются по журналу в кэше, полностью индекс перестраивается
+       раз в PANTRY_INDEX_REBUILD_INTERVAL секунд."""
+
+    def __init__(self):
+        self._state = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        """Построение индекса по текущим данным из БД."""
+        change_number = reference_cache.cache.get(CHANGES_KEY, 0)
+        rows = RecipeIngredient.objects.order_by().values_list(
+            'recipe_id', 'ingredients_id')
+        pairs = np.fromiter(
+            chain.from_iterable(rows.iterator()), dtype=np.int64
+        ).reshape(-1, 2)
+        pairs = np.unique(pairs, axis=0)
+        recipe_ids, recipe_positions, sizes = np.unique(
+            pairs[:, 0], return_inverse=True, return_counts=True)
+        indptr = np.concatenate(([0], np.cumsum(sizes)))
+        indices = pairs[:, 1]
+        order = np.argsort(indices, kind='stable')
+        ingredient_ids, starts = np.unique(indices[order], return_index=True)
+        postings = dict(zip(
+            ingredient_ids.tolist(),
+            np.split(recipe_positions[order].astype(np.int32), starts[1:])))
+        return PantryIndexState(
+            recipe_ids=recipe_ids,
+            base_count=len(recipe_ids),
+            extra_positions={},
+            sizes=sizes.astype(np.int32),
+            indptr=indptr,
+            indices=indices,
+            overrides={},
+            postings=postings,
+            change_number=change_number,
+            built_at=time.monotonic())
+
+    def apply_changes(self, state, recipe_ids, change_number):
+        """Новый снимок индекса с обновленными рецептами recipe_ids.
+           Ингредиенты изменившихся рецептов загружаются одним запросом,
+           удаленные рецепты остаются в индексе без ингредиентов."""
+        current = defaultdict(list)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+                recipe_id__in=recipe_ids).values_list(
+                    'recipe_id', 'ingredients_id'):
+            current[recipe_id].append(ingredient_id)
+        sizes = state.sizes.copy()
+        overrides = dict(state.overrides)
+        postings = dict(state.postings)
+        extra_positions = dict(state.extra_positions)
+        added_ids = []
+        for recipe_id in sorted(recipe_ids):
+            ingredients = np.unique(np.array(
+                current.get(recipe_id, []), dtype=np.int64))
+            position = state.get_position(recipe_id)
+            if position is None:
+                if not len(ingredients):
+                    continue
+                position = len(sizes)
+                extra_positions[recipe_id] = position
+                added_ids.append(recipe_id)
+                sizes = np.append(sizes, np.int32(0))
+            else:
+                for ingredient_id in state.get_ingredients(position).tolist():
+                    remaining = postings[ingredient_id]
+                    postings[ingredient_id] = remaining[remaining != position]
+            for ingredient_id in ingredients.tolist():
+                postings[ingredient_id] = np.append(
+                    postings.get(ingredient_id, np.empty(0, np.int32)),
+                    np.int32(position))
+            sizes[position] = len(ingredients)
+            overrides[position] = ingredients
+        recipe_ids = state.recipe_ids
+        if added_ids:
+            recipe_ids = np.append(recipe_ids, added_ids)
+        return PantryIndexState(
+            recipe_ids=recipe_ids,
+            base_count=state.base_count,
+            extra_positions=extra_positions,
+            sizes=sizes,
+            indptr=state.indptr,
+            indices=state.indices,
+            overrides=overrides,
+            postings=postings,
+            change_number=change_number,
+            built_at=state.built_at)
+
+    def get_state(self):
+        """Актуальный снимок индекса. Снимки не изменяются, поэтому
+           запросы в других потоках работают со своим снимком без
+           блокировки."""
+        state = self._state
+        if (state is not None
+                and time.monotonic() - state.built_at
+                < PANTRY_INDEX_REBUILD_INTERVAL
+                and reference_cache.cache.get(CHANGES_KEY, 0)
+                == state.change_number):
+            return state
+        with self._lock:
+            state = self._state
+            if (state is None or time.monotonic() - state.built_at
+                    >= PANTRY_INDEX_REBUILD_INTERVAL):
+                state = self.build()
+            else:
+                change_number = reference_cache.cache.get(CHANGES_KEY, 0)
+                if change_number != state.change_number:
+                    changes = read_changes(state.change_number, change_number)
+                    if changes is None:
+                        state = self.build()
+                    else:
+                        state = self.apply_changes(
+                            state, changes, change_number)
+            self._state = state
+        return state
+
+    def match(self, ingredient_ids, limit):
+        """Рецепты с хотя бы одним из ингредиентов ingredient_ids, по
+           убыванию доли имеющихся ингредиентов, затем по возрастанию
+           кол-ва недостающих и от новых к старым. Не более limit."""
+        state = self.get_state()
+        pantry = np.unique(np.array(list(ingredient_ids), dtype=np.int64))
+        found = [state.postings[ingredient_id]
+                 for ingredient_id in pantry.tolist()
+                 if ingredient_id in state.postings]
+        if not found:
+            return []
+        counts = np.bincount(np.concatenate(found),
+                             minlength=len(state.sizes))
+        positions = np.flatnonzero(counts)
+        matched = counts[positions]
+        totals = state.sizes[positions]
+        coverage = matched / totals
+        if len(positions) > limit:
+            threshold = np.partition(coverage, -limit)[-limit]
+            selected = coverage >= threshold
+            positions, matched, totals, coverage = (
+                positions[selected], matched[selected], totals[selected],
+                coverage[selected])
+        recipe_ids = state.recipe_ids[positions]
+        order = np.lexsort((-recipe_ids, totals - matched, -coverage))
+        return [
+            PantryMatch(
+                recipe_id=int(recipe_ids[index]),
+                matched=int(matched[index]),
+                total=int(totals[index]),
+                missing=np.setdiff1d(
+                    state.get_ingredients(int(positions[index])), pantry,
+                    assume_unique=True).tolist())
+            for index in order[:limit].tolist()
+        ]
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,173 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from rest_framework.serializers import BaseSerializer
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+current_profile = ContextVar('current_profile', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Превышен лимит SQL-запросов для действия API."""
+
+
+class RequestProfile:
+    """Показатели одного запроса: кол-во и время SQL-запросов, время
+       сериализации данных."""
+
+    def __init__(self):
+        self.label = None
+        self.queries = 0
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializing = False
+
+
+def profile_query(execute, sql, params, many, context):
+    """Обертка выполнения SQL-запросов: кол-во и время запросов
+       добавляются к показателям текущего запроса API. Профиль берется из
+       контекстной переменной, поэтому запросы учитываются и в потоках,
+       куда вынесены асинхронные представления."""
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.db_time += time.perf_counter() - started
+        profile.queries += 1
+
+
+def install_query_profiling(sender, connection, **kwargs):
+    """Подключение profile_query к новому соединению с БД (обработчик
+       сигнала connection_created)."""
+    if profile_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(profile_query)
+
+
+class MetricsRegistry:
+    """Метрики запросов в памяти процесса по действиям API. Отдаются в
+       текстовом формате Prometheus, у каждого воркера свои значения."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.durations = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self.duration_sums = defaultdict(float)
+        self.duration_counts = defaultdict(int)
+        self.queries = defaultdict(int)
+        self.db_time = defaultdict(float)
+        self.serializer_time = defaultdict(float)
+        self.budget_exceeded = defaultdict(int)
+
+    def observe(self, profile, method, status, duration, budget_exceeded):
+        label = profile.label
+        with self._lock:
+            self.requests[(label, method, status)] += 1
+            bucket = bisect_left(DURATION_BUCKETS, duration)
+            if bucket < len(DURATION_BUCKETS):
+                self.durations[label][bucket] += 1
+            self.duration_sums[label] += duration
+            self.duration_counts[label] += 1
+            self.queries[label] += profile.queries
+            self.db_time[label] += profile.db_time
+            self.serializer_time[label] += profile.serializer_time
+            if budget_exceeded:
+                self.budget_exceeded[label] += 1
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        lines = []
+
+        def add(name, kind, description, values):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(values)
+
+        with self._lock:
+            add('foodgram_requests_total', 'counter',
+                'Requests by API action, method and status.',
+                [f'foodgram_requests_total{{view="{label}",'
+                 f'method="{method}",status="{status}"}} {count}'
+                 for (label, method, status), count
+                 in sorted(self.requests.items())])
+            histogram = []
+            for label in sorted(self.duration_counts):
+                total = 0
+                for bound, count in zip(DURATION_BUCKETS,
+                                        self.durations[label]):
+                    total += count
+                    histogram.append(
+                        'foodgram_request_duration_seconds_bucket'
+                        f'{{view="{label}",le="{bound}"}} {total}')
+                histogram.extend((
+                    'foodgram_request_duration_seconds_bucket'
+                    f'{{view="{label}",le="+Inf"}} '
+                    f'{self.duration_counts[label]}',
+                    'foodgram_request_duration_seconds_sum'
+                    f'{{view="{label}"}} {self.duration_sums[label]:.6f}',
+                    'foodgram_request_duration_seconds_count'
+                    f'{{view="{label}"}} {self.duration_counts[label]}',
+                ))
+            add('foodgram_request_duration_seconds', 'histogram',
+                'Total request time by API action.', histogram)
+            for name, description, values, template in (
+                    ('foodgram_db_queries_total',
+                     'SQL queries by API action.', self.queries, '{}'),
+                    ('foodgram_db_duration_seconds_total',
+                     'SQL time by API action.', self.db_time, '{:.6f}'),
+                    ('foodgram_serializer_duration_seconds_total',
+                     'Serializer time by API action, including SQL '
+                     'queries made while serializing.',
+                     self.serializer_time, '{:.6f}'),
+                    ('foodgram_query_budget_exceeded_total',
+                     'Requests over the SQL query budget by API action.',
+                     self.budget_exceeded, '{}')):
+                add(name, 'counter', description, [
+                    f'{name}{{view="{label}"}} {template.format(value)}'
+                    for label, value in sorted(values.items())])
+        return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry()
+
+
+def timed_to_representation(to_representation):
+    """Метод to_representation сериализатора с замером времени.
+       Вложенные сериализаторы входят во время внешнего."""
+
+    @functools.wraps(to_representation)
+    def wrapper(self, instance):
+        profile = current_profile.get()
+        if profile is None or profile.serializing:
+            return to_representation(self, instance)
+        profile.serializing = True
+        started = time.perf_counter()
+        try:
+            return to_representation(self, instance)
+        finally:
+            profile.serializer_time += time.perf_counter() - started
+            profile.serializing = False
+
+    wrapper.timed = True
+    return wrapper
+
+
+def install_serializer_timing(module):
+    """Замер времени сериализации для сериализаторов из модуля
+       приложения. Классы DRF и других приложений не меняются."""
+    for serializer_class in vars(module).values():
+        if (isinstance(serializer_class, type)
+                and issubclass(serializer_class, BaseSerializer)
+                and serializer_class.__module__ == module.__name__
+                and not getattr(serializer_class.to_representation,
+                                'timed', False)):
+            serializer_class.to_representation = timed_to_representation(
+                serializer_class.to_representation)
@@ -0,0 +1,190 @@
+from collections import defaultdict
+from itertools import chain
+
+import numpy as np
+from scipy import sparse
+
+from foodgram.constants import (RECOMMENDATIONS_CACHE_SIZE,
+                                RECOMMENDATIONS_CART_WEIGHT,
+                                RECOMMENDATIONS_FAVORITE_WEIGHT,
+                                RECOMMENDATIONS_INGREDIENTS_WEIGHT,
+                                RECOMMENDATIONS_INTERACTIONS_WEIGHT,
+                                RECOMMENDATIONS_MAX_INGREDIENT_RECIPES,
+                                RECOMMENDATIONS_MAX_USER_ITEMS,
+                                RECOMMENDATIONS_SEED_LIMIT,
+                                RECOMMENDATIONS_TAGS_WEIGHT)
+from recipes.models import (FavoriteRecipes, Recipe, RecipeIngredient,
+                            RecipeNeighbor, RecipeTag, ShoppingCart)
+from users.models import Subscribers
+from .cache import reference_cache
+
+
+def load_pairs(queryset, *fields):
+    """Значения полей выборки в виде массива numpy, строка на запись."""
+    return np.fromiter(
+        chain.from_iterable(queryset.order_by().values_list(
+            *fields).iterator()),
+        dtype=np.int64
+    ).reshape(-1, len(fields))
+
+
+def normalize_rows(matrix):
+    """Нормировка строк разреженной матрицы на единичную длину, чтобы
+       произведение строк давало косинусное сходство."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def build_interactions(recipe_ids):
+    """Матрица рецепты x пользователи: избранное и список покупок с
+       весами. У каждого пользователя учитываются только последние
+       RECOMMENDATIONS_MAX_USER_ITEMS рецептов."""
+    users, recipes, weights = [], [], []
+    for model, weight in ((FavoriteRecipes, RECOMMENDATIONS_FAVORITE_WEIGHT),
+                          (ShoppingCart, RECOMMENDATIONS_CART_WEIGHT)):
+        pairs = load_pairs(model.objects, 'user_id', 'recipe_id', 'id')
+        order = np.lexsort((-pairs[:, 2], pairs[:, 0]))
+        pairs = pairs[order]
+        starts = np.searchsorted(pairs[:, 0], pairs[:, 0])
+        pairs = pairs[np.arange(len(pairs)) - starts
+                      < RECOMMENDATIONS_MAX_USER_ITEMS]
+        users.append(pairs[:, 0])
+        recipes.append(pairs[:, 1])
+        weights.append(np.full(len(pairs), weight))
+    users, recipes, weights = (np.concatenate(users),
+                               np.concatenate(recipes),
+                               np.concatenate(weights))
+    known = np.isin(recipes, recipe_ids)
+    user_ids, user_positions = np.unique(users[known], return_inverse=True)
+    return normalize_rows(sparse.csr_matrix(
+        (weights[known],
+         (np.searchsorted(recipe_ids, recipes[known]), user_positions)),
+        shape=(len(recipe_ids), len(user_ids))))
+
+
+def build_features(recipe_ids, queryset, field, max_recipes=None):
+    """Матрица рецепты x признаки (теги или ингредиенты) с весами IDF:
+       чем реже признак, тем больше его вес. Признаки, которые есть
+       более чем в max_recipes рецептах, не учитываются."""
+    pairs = load_pairs(queryset, 'recipe_id', field)
+    pairs = pairs[np.isin(pairs[:, 0], recipe_ids)]
+    feature_ids, features, counts = np.unique(
+        pairs[:, 1], return_inverse=True, return_counts=True)
+    idf = np.log((1 + len(recipe_ids)) / (1 + counts)) + 1
+    if max_recipes is not None:
+        idf[counts > max_recipes] = 0
+    matrix = sparse.csr_matrix(
+        (idf[features], (np.searchsorted(recipe_ids, pairs[:, 0]), features)),
+        shape=(len(recipe_ids), len(feature_ids)))
+    matrix.eliminate_zeros()
+    return normalize_rows(matrix)
+
+
+def build_neighbors(neighbors, batch_size):
+    """Похожие рецепты по модели item-item. Сходство рецептов - взвешенная
+       сумма косинусного сходства по пользователям, добавившим оба рецепта
+       в избранное или список покупок, по ингредиентам и по тегам. Теги
+       уточняют оценку уже найденных пар, но сами пары не добавляют.
+       Матрицы перемножаются блоками по batch_size рецептов, для каждого
+       рецепта остаются neighbors лучших. Возвращает тройки (рецепт,
+       похожий рецепт, оценка)."""
+    recipe_ids = np.sort(np.fromiter(
+        Recipe.objects.values_list('id', flat=True).iterator(),
+        dtype=np.int64))
+    if not len(recipe_ids):
+        return
+    interactions = build_interactions(recipe_ids)
+    ingredients = build_features(
+        recipe_ids, RecipeIngredient.objects, 'ingredients_id',
+        RECOMMENDATIONS_MAX_INGREDIENT_RECIPES)
+    tags = build_features(
+        recipe_ids, RecipeTag.objects, 'tags_id').toarray()
+    interactions_t = interactions.T.tocsr()
+    ingredients_t = ingredients.T.tocsr()
+    for start in range(0, len(recipe_ids), batch_size):
+        stop = min(start + batch_size, len(recipe_ids))
+        scores = (
+            RECOMMENDATIONS_INTERACTIONS_WEIGHT
+            * (interactions[start:stop] @ interactions_t)
+            + RECOMMENDATIONS_INGREDIENTS_WEIGHT
+            * (ingredients[start:stop] @ ingredients_t)
+        ).tocoo()
+        rows = scores.row + start
+        selected = rows != scores.col
+        rows, columns, values = (
+            rows[selected], scores.col[selected], scores.data[selected])
+        values = values + RECOMMENDATIONS_TAGS_WEIGHT * np.einsum(
+            'ij,ij->i', tags[rows], tags[columns])
+        order = np.lexsort((-values, rows))
+        rows, columns, values = rows[order], columns[order], values[order]
+        selected = (np.arange(len(rows)) - np.searchsorted(rows, rows)
+                    < neighbors)
+        yield from zip(recipe_ids[rows[selected]].tolist(),
+                       recipe_ids[columns[selected]].tolist(),
+                       values[selected].tolist())
+
+
+def get_user_key(user_id):
+    return f'user:{user_id}'
+
+
+def get_popular_ids():
+    """Самые популярные рецепты по кол-ву добавлений в избранное."""
+    recipe_ids, _ = reference_cache.get_or_set(
+        'recommendations', 'popular',
+        lambda: list(Recipe.objects.order_by(
+            '-favorites_count', '-id'
+        ).values_list('id', flat=True)[:RECOMMENDATIONS_CACHE_SIZE]))
+    return recipe_ids
+
+
+def get_user_recommendations(user):
+    """Рекомендации пользователю по готовой таблице похожих рецептов:
+       оценки похожих рецептов для последних рецептов из избранного и
+       списка покупок складываются. Если рекомендаций мало, добавляются
+       новые рецепты авторов из подписок, затем популярные рецепты.
+       Уже добавленные пользователем и свои рецепты не рекомендуются."""
+    seen = set()
+    seeds = set()
+    for model in (FavoriteRecipes, ShoppingCart):
+        recipe_ids = list(model.objects.filter(user=user).order_by(
+            '-id').values_list('recipe_id', flat=True))
+        seen.update(recipe_ids)
+        seeds.update(recipe_ids[:RECOMMENDATIONS_SEED_LIMIT])
+    scores = defaultdict(float)
+    for neighbor_id, score in RecipeNeighbor.objects.filter(
+            recipe__in=seeds).exclude(
+                neighbor__author=user).values_list('neighbor_id', 'score'):
+        if neighbor_id not in seen:
+            scores[neighbor_id] += score
+    recommended = sorted(scores, key=lambda recipe_id: (
+        -scores[recipe_id], -recipe_id))[:RECOMMENDATIONS_CACHE_SIZE]
+    if len(recommended) < RECOMMENDATIONS_CACHE_SIZE:
+        seen.update(recommended)
+        subscriptions = Recipe.objects.filter(
+            author__in=Subscribers.objects.filter(
+                user=user).values('author')
+        ).order_by('-pub_date', '-id').values_list(
+            'id', flat=True)[:RECOMMENDATIONS_CACHE_SIZE]
+        popular = get_popular_ids()
+        seen.update(Recipe.objects.filter(
+            id__in=popular, author=user).values_list('id', flat=True))
+        for recipe_id in chain(subscriptions, popular):
+            if len(recommended) == RECOMMENDATIONS_CACHE_SIZE:
+                break
+            if recipe_id not in seen:
+                seen.add(recipe_id)
+                recommended.append(recipe_id)
+    return recommended
+
+
+def get_recommended_ids(user):
+    """Id рекомендованных рецептов из кэша пользователя. Анонимному
+       пользователю рекомендуются популярные рецепты."""
+    if not user.is_authenticated:
+        return get_popular_ids()
+    recipe_ids, _ = reference_cache.get_or_set(
+        'recommendations', get_user_key(user.id),
+        lambda: get_user_recommendations(user))
+    return recipe_ids
@@ -0,0 +1,74 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders, json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Разделители строк, которые JSONRenderer DRF экранирует, чтобы JSON
+# оставался корректным JavaScript.
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson. Результат совпадает с JSONRenderer DRF:
+       компактный JSON в UTF-8, datetime в ISO 8601 с Z для UTC, Decimal,
+       UUID, ленивые строки и прочие типы - через JSONEncoder DRF.
+       Побайтно отличается только запись дробных чисел в экспоненциальной
+       форме (1e16, а не 1e+16). Если orjson не установлен, запрошен
+       отступ (Browsable API, indent в Accept), отключены
+       UNICODE_JSON/COMPACT_JSON или данные не поддерживаются orjson
+       (например, целые больше 64 бит), рендеринг выполняется стандартным
+       JSONRenderer."""
+    options = 0
+    if orjson is not None:
+        options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii
+                or not self.compact
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            content = orjson.dumps(data,
+                                   default=encoders.JSONEncoder().default,
+                                   option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        return content
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser на orjson. JSON, который orjson не разбирает (целые
+       больше 64 бит, тело не в UTF-8), разбирается стандартным модулем
+       json, поэтому принимаются те же данные, что и JSONParser DRF."""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        content = stream.read()
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+        encoding = parser_context.get('encoding', 'utf-8')
+        try:
+            return json.loads(
+                content.decode(encoding),
+                parse_constant=json.strict_constant if self.strict else None)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
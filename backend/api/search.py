@@ -0,0 +1,221 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Lower, Replace
+
+from foodgram.constants import SEARCH_CONFIG
+from recipes.models import Ingredient, Recipe, RecipeIngredient, RecipeTag
+from .cache import reference_cache
+
+RUSSIAN_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ать',
+    'ять', 'ить', 'еть', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ой', 'ей',
+    'ий', 'ый', 'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ов', 'ев', 'ую', 'юю',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+
+UPDATE_SEARCH_VECTOR_SQL = """
+UPDATE recipes_recipe SET search_vector =
+    setweight(to_tsvector(%(config)s, translate(
+        recipes_recipe.name, 'Ёё', 'Ее')), 'A')
+    || setweight(to_tsvector(%(config)s, translate(coalesce((
+        SELECT string_agg(tag.name, ' ')
+        FROM recipes_recipetag recipe_tag
+        JOIN recipes_tag tag ON tag.id = recipe_tag.tags_id
+        WHERE recipe_tag.recipe_id = recipes_recipe.id), ''),
+        'Ёё', 'Ее')), 'B')
+    || setweight(to_tsvector(%(config)s, translate(coalesce((
+        SELECT string_agg(ingredient.name, ' ')
+        FROM recipes_recipeingredient recipe_ingredient
+        JOIN recipes_ingredient ingredient
+            ON ingredient.id = recipe_ingredient.ingredients_id
+        WHERE recipe_ingredient.recipe_id = recipes_recipe.id), ''),
+        'Ёё', 'Ее')), 'B')
+    || setweight(to_tsvector(%(config)s, translate(
+        recipes_recipe.text, 'Ёё', 'Ее')), 'C')
+WHERE recipes_recipe.id = ANY(%(recipe_ids)s)
+"""
+
+
+def normalize(text):
+    """Приводит строку к виду для поиска: нижний регистр, ё -> е."""
+    return text.lower().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов в памяти процесса. Используется
+       вместо индекса БД, если БД не PostgreSQL (например, SQLite в тестах).
+       Названия хранятся отсортированными, поиск по началу названия
+       выполняется бинарным поиском. Индекс перестраивается при смене
+       версии ингредиентов в кэше справочных данных."""
+
+    def __init__(self):
+        self._entries = None
+        self._version = None
+
+    def build(self):
+        """Построение индекса по текущим данным из БД."""
+        entries = sorted(
+            (normalize(name), ingredient_id)
+            for ingredient_id, name in Ingredient.objects.values_list(
+                'id', 'name'))
+        names = [name for name, _ in entries]
+        ids = [ingredient_id for _, ingredient_id in entries]
+        return names, ids
+
+    def search(self, term, limit):
+        """Id ингредиентов: сначала совпадения по началу названия, затем
+           по вхождению в название, не более limit."""
+        version = reference_cache.get_version('ingredients')
+        entries = self._entries
+        if entries is None or self._version != version:
+            entries = self._entries = self.build()
+            self._version = version
+        names, ids = entries
+        term = normalize(term)
+        found = []
+        position = bisect_left(names, term)
+        while (position < len(names) and len(found) < limit
+               and names[position].startswith(term)):
+            found.append(ids[position])
+            position += 1
+        if len(found) < limit:
+            for name, ingredient_id in zip(names, ids):
+                if term in name and not name.startswith(term):
+                    found.append(ingredient_id)
+                    if len(found) == limit:
+                        break
+        return found
+
+
+ingredient_index = IngredientIndex()
+
+
+def search_ingredients(queryset, term, limit):
+    """Поиск ингредиентов по названию без учета регистра и различия ё/е.
+       В PostgreSQL поиск идет по триграммному индексу на нормализованном
+       названии, в остальных БД - по индексу в памяти процесса."""
+    if connection.vendor == 'postgresql':
+        term = normalize(term)
+        return queryset.annotate(
+            search_name=Replace(Lower('name'), Value('ё'), Value('е'))
+        ).filter(
+            search_name__contains=term
+        ).annotate(
+            prefix_match=Case(
+                When(search_name__startswith=term, then=0),
+                default=1,
+                output_field=IntegerField())
+        ).order_by('prefix_match', 'search_name', 'id')[:limit]
+    ids = ingredient_index.search(term, limit)
+    return queryset.filter(id__in=ids).order_by(Case(
+        *[When(id=ingredient_id, then=position)
+          for position, ingredient_id in enumerate(ids)],
+        output_field=IntegerField()))
+
+
+def get_search_terms(text):
+    """Слова текста без окончаний - упрощенный стемминг для индекса в
+       памяти процесса."""
+    terms = []
+    for word in re.findall(r'\w+', normalize(text)):
+        for ending in RUSSIAN_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= 3:
+                word = word[:-len(ending)]
+                break
+        terms.append(word)
+    return terms
+
+
+class RecipeSearchIndex:
+    """Обратный индекс рецептов в памяти процесса: слово -> {id рецепта:
+       вес}. Используется вместо полнотекстового поиска PostgreSQL в
+       остальных БД. Вес совпадения: название - 3, теги и ингредиенты - 2,
+       описание - 1. Индекс перестраивается при смене версии рецептов в
+       кэше."""
+    NAME_WEIGHT = 3
+    RELATED_WEIGHT = 2
+    TEXT_WEIGHT = 1
+
+    def __init__(self):
+        self._postings = None
+        self._version = None
+
+    def build(self):
+        """Построение индекса по текущим данным из БД."""
+        postings = defaultdict(lambda: defaultdict(int))
+
+        def add(recipe_id, text, weight):
+            for term in set(get_search_terms(text)):
+                postings[term][recipe_id] = max(
+                    postings[term][recipe_id], weight)
+
+        for recipe_id, name, text in Recipe.objects.values_list(
+                'id', 'name', 'text'):
+            add(recipe_id, name, self.NAME_WEIGHT)
+            add(recipe_id, text, self.TEXT_WEIGHT)
+        for recipe_id, name in RecipeTag.objects.values_list(
+                'recipe', 'tags__name'):
+            add(recipe_id, name, self.RELATED_WEIGHT)
+        for recipe_id, name in RecipeIngredient.objects.values_list(
+                'recipe', 'ingredients__name'):
+            add(recipe_id, name, self.RELATED_WEIGHT)
+        return postings
+
+    def search(self, query):
+        """Id рецептов, содержащих все слова запроса, по убыванию веса."""
+        version = reference_cache.get_version('recipes')
+        postings = self._postings
+        if postings is None or self._version != version:
+            postings = self._postings = self.build()
+            self._version = version
+        ranks = None
+        for term in set(get_search_terms(query)):
+            matches = postings.get(term, {})
+            if ranks is None:
+                ranks = dict(matches)
+            else:
+                ranks = {recipe_id: rank + matches[recipe_id]
+                         for recipe_id, rank in ranks.items()
+                         if recipe_id in matches}
+        return sorted(ranks or {}, key=lambda recipe_id: (
+            -ranks[recipe_id], -recipe_id))
+
+
+recipe_index = RecipeSearchIndex()
+
+
+def update_search_vectors(recipe_ids):
+    """Обновление поисковых векторов рецептов по названию, описанию,
+       тегам и ингредиентам одним запросом."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(UPDATE_SEARCH_VECTOR_SQL,
+                           {'config': SEARCH_CONFIG,
+                            'recipe_ids': list(recipe_ids)})
+    else:
+        transaction.on_commit(lambda: reference_cache.invalidate('recipes'))
+
+
+def update_search_vector(recipe):
+    """Обновление поискового вектора рецепта после сохранения."""
+    update_search_vectors([recipe.pk])
+
+
+def search_recipes(queryset, query):
+    """Полнотекстовый поиск рецептов с сортировкой по релевантности."""
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(normalize(query), config=SEARCH_CONFIG,
+                                   search_type='websearch')
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-search_rank', '-id')
+    ids = recipe_index.search(query)
+    return queryset.filter(id__in=ids).order_by(Case(
+        *[When(id=recipe_id, then=position)
+          for position, recipe_id in enumerate(ids)],
+        output_field=IntegerField()))
@@ -1,9 +1,21 @@
+from django import forms
+from django.db import models, transaction
+from django.db.models import F
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
-
-from foodgram.constants import DEFAULT_PAGES_LIMIT
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from foodgram.constants import (DEFAULT_PAGES_LIMIT, PANTRY_MAX_RESULTS_LIMIT,
+                                PANTRY_RESULTS_LIMIT, RECIPE_IMAGE_VARIANTS,
+                                RECIPES_REPRESENTATION_VERSION,
+                                RECOMMENDATIONS_MAX_RESULTS_LIMIT)
+from recipes.images import get_image_url
+from .cache import recipe_fragments, reference_cache
+from .pantry import schedule_recipe_change
+from .search import update_search_vector
 from recipes.models import (FavoriteRecipes, Ingredient, Recipe,
-                            RecipeIngredient, ShoppingCart, Tag)
+                            RecipeImageUpload, RecipeIngredient, ShoppingCart,
+                            Tag)
 from users.models import Subscribers, User
 
 
@@ -24,6 +36,8 @@ class UsersSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         """Подписан ли текущий пользователь на автора рецепта."""
+        if hasattr(obj, 'user_subscribed'):
+            return obj.user_subscribed
         user = self.context.get('request')
         return bool(user and user.user.is_authenticated
                     and Subscribers.objects.filter(
@@ -31,14 +45,29 @@ class UsersSerializer(serializers.ModelSerializer):
                         user=user.user).exists())
 
 
+class RecipeImageField(Base64ImageField):
+    """Картинка рецепта в base64. Тип файла проверяется по сигнатуре,
+       полное декодирование картинки выполняется в фоне при построении
+       ее уменьшенных копий."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('_DjangoImageField', forms.FileField)
+        super().__init__(*args, **kwargs)
+
+
 class HelperRecipeSerializer(serializers.ModelSerializer):
     """Вспомогательный сериализатор для корректного отображения рецептов
        в списке рецептов автора."""
+    image = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
+    def get_image(self, obj):
+        """Уменьшенная копия картинки рецепта."""
+        return get_image_url(obj, request=self.context.get('request'))
+
 
 class SubscriptionsListSerializer(serializers.ModelSerializer):
     """Сериализатор для отображения подписок для текущего
@@ -68,25 +97,47 @@ class SubscriptionsListSerializer(serializers.ModelSerializer):
     def get_is_subscribed(self, obj):
         """Подписан ли текущий пользователь на автора рецепта."""
         user = self.context.get('request').user
+        if obj.user_id == user.id:
+            return True
         return Subscribers.objects.filter(author=obj.author,
                                           user=user).exists()
 
     def get_recipes(self, obj):
-        """Список рецептов автора."""
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit', DEFAULT_PAGES_LIMIT)
-        try:
-            limit = int(limit)
-        except ValueError:
-            pass
-        return HelperRecipeSerializer(
-            Recipe.objects.filter(author=obj.author)[:limit],
-            many=True
-        ).data
+        """Список рецептов автора. Рецепты для всей страницы подписок
+           подгружаются заранее во вьюсете."""
+        recipes = getattr(obj.author, 'recipes_preview', None)
+        if recipes is None:
+            recipes = obj.author.recipes.order_by('-id')[
+                :self.context.get('recipes_limit', DEFAULT_PAGES_LIMIT)]
+        return HelperRecipeSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
         """Кол-во рецептов автора."""
-        return Recipe.objects.filter(author=obj.author).count()
+        return obj.author.recipes_count
+
+
+class PantryQuerySerializer(serializers.Serializer):
+    """Валидация параметров подбора рецептов по продуктам."""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False)
+    limit = serializers.IntegerField(min_value=1,
+                                     max_value=PANTRY_MAX_RESULTS_LIMIT,
+                                     default=PANTRY_RESULTS_LIMIT)
+
+
+class RecommendationsQuerySerializer(serializers.Serializer):
+    """Валидация параметров рекомендаций рецептов."""
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=RECOMMENDATIONS_MAX_RESULTS_LIMIT,
+        default=DEFAULT_PAGES_LIMIT)
+
+
+class RecipesLimitSerializer(serializers.Serializer):
+    """Валидация параметра recipes_limit списка подписок."""
+    recipes_limit = serializers.IntegerField(min_value=0,
+                                             default=DEFAULT_PAGES_LIMIT)
 
 
 class SubscribeSerializer(serializers.ModelSerializer):
@@ -127,6 +178,23 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
+class PantryRecipeSerializer(HelperRecipeSerializer):
+    """Сериализатор рецепта, подобранного по продуктам пользователя:
+       доля имеющихся ингредиентов и список недостающих."""
+    coverage = serializers.FloatField(read_only=True)
+    matched_count = serializers.IntegerField(read_only=True)
+    ingredients_count = serializers.IntegerField(read_only=True)
+    missing_ingredients = IngredientSerializer(many=True, read_only=True)
+
+    class Meta(HelperRecipeSerializer.Meta):
+        fields = HelperRecipeSerializer.Meta.fields + (
+            'coverage',
+            'matched_count',
+            'ingredients_count',
+            'missing_ingredients',
+        )
+
+
 class GetRecipeIngredientSerializer(serializers.ModelSerializer):
     """Вспомогательный cериалайзер для корректного отображения
        Ингредиентов - рецепта."""
@@ -142,6 +210,15 @@ class GetRecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class RecipeFragmentsListSerializer(serializers.ListSerializer):
+    """Список рецептов: части представлений из кэша для всей страницы
+       запрашиваются у кэша одним обращением."""
+
+    def to_representation(self, data):
+        recipes = data.all() if isinstance(data, models.Manager) else data
+        return self.child.to_representation_many(recipes)
+
+
 class GetRecipeSerializer(serializers.ModelSerializer):
     """Cериалайзер для метода GET модели рецептов."""
     author = UsersSerializer(read_only=True)
@@ -152,6 +229,7 @@ class GetRecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -164,12 +242,99 @@ class GetRecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
             'text',
-            'cooking_time'
+            'cooking_time',
+            'favorites_count'
         )
+        list_serializer_class = RecipeFragmentsListSerializer
+
+    def to_representation(self, recipe):
+        return self.to_representation_many([recipe])[0]
+
+    def to_representation_many(self, recipes):
+        """Представления рецептов. Не зависящая от пользователя часть
+           берется из кэша recipe_fragments по id и версии рецепта,
+           признаки текущего пользователя добавляются к ней при каждом
+           запросе."""
+        get_key = self.get_fragment_key_function()
+        keys = [get_key(recipe) for recipe in recipes]
+        fragments = recipe_fragments.get_many(filter(None, keys))
+        new_fragments = {}
+        representations = []
+        for recipe, key in zip(recipes, keys):
+            if hasattr(recipe, 'user_subscribed'):
+                recipe.author.user_subscribed = recipe.user_subscribed
+            fragment = fragments.get(key)
+            if fragment is None:
+                fragment = self.to_fragment(recipe)
+                if key is not None:
+                    new_fragments[key] = fragment
+            representations.append(self.add_user_fields(fragment, recipe))
+        if new_fragments:
+            recipe_fragments.set_many(new_fragments)
+        return representations
+
+    def get_fragment_key_function(self):
+        """Функция ключа кэша для рецепта. Ключ меняется при изменении
+           рецепта, его автора и счетчика избранного (поле version),
+           тегов и ингредиентов (версии кэша справочных данных), адреса
+           сайта (ссылки на картинки абсолютные). Для рецепта без
+           загруженной версии - None, такой рецепт не кэшируется."""
+        request = self.context.get('request')
+        prefix = ':'.join(map(str, (
+            'recipe',
+            RECIPES_REPRESENTATION_VERSION,
+            reference_cache.get_version('tags'),
+            reference_cache.get_version('ingredients'),
+            request.build_absolute_uri('/') if request else '',
+        )))
+
+        def get_key(recipe):
+            if ({'version', 'modified_at'} & recipe.get_deferred_fields()
+                    or not isinstance(recipe.version, int)):
+                return None
+            return (f'{prefix}:{recipe.pk}:{recipe.version}:'
+                    f'{recipe.modified_at.timestamp()}')
+
+        return get_key
+
+    def to_fragment(self, recipe):
+        """Представление рецепта без признаков текущего пользователя."""
+        fragment = super().to_representation(recipe)
+        fragment['is_favorited'] = None
+        fragment['is_in_shopping_cart'] = None
+        fragment['author']['is_subscribed'] = None
+        return fragment
+
+    def add_user_fields(self, fragment, recipe):
+        """Копия представления из кэша с признаками текущего
+           пользователя."""
+        data = fragment.copy()
+        data['author'] = fragment['author'].copy()
+        data['author']['is_subscribed'] = self.fields[
+            'author'].get_is_subscribed(recipe.author)
+        data['is_favorited'] = self.get_is_favorited(recipe)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(recipe)
+        return data
+
+    def get_images(self, obj):
+        """Ссылки на уменьшенные копии и исходную картинку рецепта,
+           в исходном формате и в WebP."""
+        request = self.context.get('request')
+        return {
+            variant: {
+                image_format: get_image_url(obj, variant, image_format,
+                                            request)
+                for image_format in ('default', 'webp')
+            }
+            for variant in (*RECIPE_IMAGE_VARIANTS, 'original')
+        }
 
     def get_is_favorited(self, obj):
         """Являяется ли рецепт избранным для текущего пользователя."""
+        if hasattr(obj, 'user_favorited'):
+            return obj.user_favorited
         user = self.context.get('request')
         return bool(user and user.user.is_authenticated
                     and FavoriteRecipes.objects.filter(
@@ -178,6 +343,8 @@ class GetRecipeSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         """Является ли рецепт в списке покупок для текущего пользователя."""
+        if hasattr(obj, 'user_in_shopping_cart'):
+            return obj.user_in_shopping_cart
         user = self.context.get('request')
         return bool(user and user.user.is_authenticated
                     and ShoppingCart.objects.filter(
@@ -185,25 +352,90 @@ class GetRecipeSerializer(serializers.ModelSerializer):
                         user=user.user).exists())
 
 
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список связанных объектов, все объекты загружаются из БД одним
+       запросом, а не отдельным запросом на каждый id."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        try:
+            objects = self.child_relation.get_queryset().in_bulk(data)
+        except (TypeError, ValueError):
+            objects = {}
+        return [
+            objects.get(pk) if isinstance(pk, int) and pk in objects
+            else self.child_relation.to_internal_value(pk)
+            for pk in data]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Поле id связанного объекта, при many=True объекты загружаются
+       одним запросом."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
+class AddRecipeIngredientListSerializer(serializers.ListSerializer):
+    """Ингредиенты рецепта загружаются из БД одним запросом."""
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        ingredients = Ingredient.objects.in_bulk(
+            {item['id'] for item in items})
+        message = serializers.PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist']
+        errors = []
+        for item in items:
+            pk = item['id']
+            item['id'] = ingredients.get(pk)
+            errors.append({} if item['id'] else {
+                'id': [str(message).format(pk_value=pk)]})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+
 class AddRecipeIngredientSerializer(serializers.ModelSerializer):
     """Вспомогательный cериалайзер для корректного добавления
        Ингредиентов в рецепт при его создании."""
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
 
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = AddRecipeIngredientListSerializer
+
+
+class RecipeImageUploadSerializer(serializers.ModelSerializer):
+    """Сериализатор для загрузки картинки рецепта файлом."""
+    image = serializers.FileField()
+
+    class Meta:
+        model = RecipeImageUpload
+        fields = ('id', 'image')
 
 
 class AddRecipeSerializer(serializers.ModelSerializer):
     """Cериалайзер для метода Post, PATCH и DEL модели рецептов."""
-    tags = serializers.PrimaryKeyRelatedField(queryset=Tag.objects.all(),
-                                              many=True,
-                                              write_only=True)
+    tags = BulkPrimaryKeyRelatedField(queryset=Tag.objects.all(),
+                                      many=True,
+                                      write_only=True)
     ingredients = AddRecipeIngredientSerializer(many=True, write_only=True)
     author = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    image = Base64ImageField()
+    image = RecipeImageField(required=False)
+    image_upload = serializers.PrimaryKeyRelatedField(
+        queryset=RecipeImageUpload.objects.all(),
+        write_only=True,
+        required=False)
 
     class Meta:
         model = Recipe
@@ -216,6 +448,7 @@ class AddRecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_upload',
             'text',
             'cooking_time'
         )
@@ -225,18 +458,42 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         recipe.tags.set(tags)
 
     def add_ingredients(self, ingredients, recipe):
-        """Сохранение в БД ингридиентов рецепта."""
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
+        """Сохранение в БД ингридиентов рецепта одним запросом."""
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
                 recipe=recipe,
                 ingredients=ingredient['id'],
                 amount=ingredient['amount'])
+            for ingredient in ingredients)
+
+    def update_ingredients(self, ingredients, recipe):
+        """Изменение ингридиентов рецепта: удаляются, добавляются и
+           обновляются только изменившиеся записи."""
+        current = {
+            recipe_ingredient.ingredients_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipeingredients.all()}
+        new_ingredients = []
+        changed = []
+        for ingredient in ingredients:
+            recipe_ingredient = current.pop(ingredient['id'].id, None)
+            if recipe_ingredient is None:
+                new_ingredients.append(ingredient)
+            elif recipe_ingredient.amount != ingredient['amount']:
+                recipe_ingredient.amount = ingredient['amount']
+                changed.append(recipe_ingredient)
+        if current:
+            RecipeIngredient.objects.filter(
+                id__in=[item.id for item in current.values()]).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        if new_ingredients:
+            self.add_ingredients(new_ingredients, recipe)
 
     def validate(self, data):
         """Валидация при создании рецепта."""
         ingredients = data.get('ingredients')
         tags = data.get('tags')
-        image = data.get('image')
+        image = data.get('image') or data.get('image_upload')
         if not ingredients:
             raise serializers.ValidationError('Укажите необходимые'
                                               ' ингридиенты для рецепта!')
@@ -255,29 +512,54 @@ class AddRecipeSerializer(serializers.ModelSerializer):
                                               'рецепта!')
         return data
 
+    def validate_image_upload(self, image_upload):
+        """Использовать можно только свою загруженную картинку."""
+        if image_upload.author_id != self.context['request'].user.id:
+            raise serializers.ValidationError('Картинка не найдена!')
+        return image_upload
+
+    def attach_image_upload(self, validated_data):
+        """Картинка, загруженная файлом, переходит к рецепту. Запись о
+           загрузке удаляется одним запросом, без сбора связанных объектов
+           и сигналов."""
+        image_upload = validated_data.pop('image_upload', None)
+        if image_upload is not None:
+            validated_data['image'] = image_upload.image.name
+            RecipeImageUpload.objects.filter(pk=image_upload.pk).delete()
+
+    @transaction.atomic
     def create(self, validated_data):
         """Создание рецепта."""
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
+        self.attach_image_upload(validated_data)
         recipe = super().create(validated_data)
         self.add_tags(tags, recipe)
         self.add_ingredients(ingredients, recipe)
+        update_search_vector(recipe)
+        schedule_recipe_change(recipe.pk)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         """Внесение изменений в рецепт."""
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        recipe.tags.clear()
-        recipe.ingredients.clear()
+        self.attach_image_upload(validated_data)
+        recipe.version = F('version') + 1
         recipe = super().update(recipe, validated_data)
         self.add_tags(tags, recipe)
-        self.add_ingredients(ingredients, recipe)
+        self.update_ingredients(ingredients, recipe)
+        update_search_vector(recipe)
+        schedule_recipe_change(recipe.pk)
         return recipe
 
     def to_representation(self, recipe):
         """Корректировка отображения информации о созданном рецепте."""
-        return GetRecipeSerializer(recipe).data
+        request = self.context.get('request')
+        recipe = Recipe.objects.with_related().with_user_flags(
+            request.user).get(pk=recipe.pk)
+        return GetRecipeSerializer(recipe, context=self.context).data
 
 
 class ShoppingCartSerializer(serializers.ModelSerializer):
@@ -285,9 +567,7 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
     name = serializers.ReadOnlyField(
         source='recipe.name',
         read_only=True)
-    image = serializers.ImageField(
-        source='recipe.image',
-        read_only=True)
+    image = serializers.SerializerMethodField()
     cooking_time = serializers.IntegerField(
         source='recipe.cooking_time',
         read_only=True)
@@ -296,6 +576,10 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         model = ShoppingCart
         fields = ('id', 'name', 'image', 'cooking_time')
 
+    def get_image(self, obj):
+        """Уменьшенная копия картинки рецепта."""
+        return get_image_url(obj.recipe, request=self.context.get('request'))
+
 
 class FavoriteRecipesSerializer(ShoppingCartSerializer):
     """Сериализатор для модели Избранных рецептов."""
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from import_export.signals import post_import
+
+from recipes.models import (FavoriteRecipes, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from users.models import Subscribers
+from .cache import reference_cache
+from .pantry import schedule_recipe_change
+from .recommendations import get_user_key
+
+REFERENCE_NAMESPACES = {
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_reference_cache(sender, **kwargs):
+    """Сброс кэша справочных данных при их изменении."""
+    reference_cache.invalidate(REFERENCE_NAMESPACES[sender])
+
+
+@receiver(post_import)
+def invalidate_reference_cache_after_import(sender, model, **kwargs):
+    """Сброс кэша справочных данных после импорта из Админки."""
+    if model in REFERENCE_NAMESPACES:
+        reference_cache.invalidate(REFERENCE_NAMESPACES[model])
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_search_index(sender, **kwargs):
+    """Сброс индекса поиска рецептов при удалении рецепта."""
+    reference_cache.invalidate('recipes')
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def record_pantry_change(sender, instance, **kwargs):
+    """Обновление рецепта в индексе подбора по продуктам при изменении
+       его ингредиентов, в том числе из Админки."""
+    schedule_recipe_change(instance.recipe_id)
+
+
+@receiver((post_save, post_delete), sender=FavoriteRecipes)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscribers)
+def invalidate_user_recommendations(sender, instance, **kwargs):
+    """Сброс рекомендаций пользователя при изменении его избранного,
+       списка покупок или подписок."""
+    reference_cache.delete('recommendations', get_user_key(instance.user_id))
@@ -0,0 +1,16 @@
+from django.contrib.staticfiles.storage import StaticFilesStorage
+
+from .compression import precompress_file
+
+
+class PrecompressedStaticFilesStorage(StaticFilesStorage):
+    """Хранилище статики, которое при collectstatic сохраняет рядом с
+       файлами их сжатые копии (.gz, .br), nginx отдает их без сжатия на
+       каждый запрос (gzip_static)."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        for name in paths:
+            _, compressed = precompress_file(self.path(name))
+            yield name, name, bool(compressed)
@@ -0,0 +1,98 @@
+import base64
+import io
+
+from django.core.cache import caches
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.cache import recipe_fragments
+from api.search import update_search_vectors
+from foodgram.constants import REFERENCE_CACHE_ALIAS
+from recipes.models import Ingredient, Recipe, RecipeIngredient, RecipeTag, Tag
+from users.models import User
+
+
+def get_image_file():
+    """Файл картинки PNG."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (2, 2), 'white').save(buffer, 'PNG')
+    buffer.name = 'recipe.png'
+    buffer.seek(0)
+    return buffer
+
+
+def get_image_data():
+    """Картинка PNG в формате поля image рецепта (base64)."""
+    return ('data:image/png;base64,'
+            + base64.b64encode(get_image_file().getvalue()).decode())
+
+
+class RecipesDataMixin:
+    """Данные для тестов API рецептов: автор, пользователь, теги и
+       ингредиенты. Кэши очищаются перед каждым тестом."""
+    tags_count = 3
+    ingredients_count = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author',
+            first_name='Автор', last_name='Рецептов', password='password')
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user',
+            first_name='Пользователь', last_name='Сайта',
+            password='password')
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {number}', color=f'#00000{number}',
+                               slug=f'tag-{number}')
+            for number in range(cls.tags_count)]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(cls.ingredients_count)]
+
+    @classmethod
+    def create_recipes(cls, count, author=None):
+        """Рецепты с двумя тегами и тремя ингредиентами каждый."""
+        recipes = []
+        for number in range(count):
+            recipe = Recipe.objects.create(
+                author=author or cls.author, name=f'Рецепт {number}',
+                text='Описание рецепта', cooking_time=10,
+                image='recipes_images/recipe.png')
+            RecipeTag.objects.bulk_create(
+                RecipeTag(recipe=recipe, tags=tag) for tag in cls.tags[:2])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredients=ingredient,
+                                 amount=number + 1)
+                for ingredient in cls.ingredients[:3])
+            recipes.append(recipe)
+        update_search_vectors([recipe.pk for recipe in recipes])
+        return recipes
+
+    def clear_caches(self):
+        caches[REFERENCE_CACHE_ALIAS].clear()
+        recipe_fragments.clear()
+
+    def setUp(self):
+        self.clear_caches()
+        self.anonymous_client = APIClient()
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(self.author)
+        self.user_client = APIClient()
+        self.user_client.force_authenticate(self.user)
+
+    def get_recipe_data(self, tags=None, ingredients=None):
+        """Данные для создания рецепта через API."""
+        tags = self.tags[:2] if tags is None else tags
+        ingredients = (self.ingredients[:3] if ingredients is None
+                       else ingredients)
+        return {
+            'name': 'Новый рецепт',
+            'text': 'Описание рецепта',
+            'cooking_time': 15,
+            'image': get_image_data(),
+            'tags': [tag.id for tag in tags],
+            'ingredients': [{'id': ingredient.id, 'amount': 10}
+                            for ingredient in ingredients],
+        }
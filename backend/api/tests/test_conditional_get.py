@@ -0,0 +1,57 @@
+import time
+
+from django.test import TestCase
+from django.utils.http import http_date
+
+from .base import RecipesDataMixin
+
+
+class RecipesConditionalGetTest(RecipesDataMixin, TestCase):
+    """Условные запросы к рецептам: ответ 304 только если не изменились
+       ни рецепты, ни признаки пользователя."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipes(1)[0]
+        cls.url = f'/api/recipes/{cls.recipe.id}/'
+
+    def test_if_none_match(self):
+        response = self.user_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = self.user_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.user_client.post(f'{self.url}favorite/')
+        response = self.user_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_favorited'])
+
+    def test_if_modified_since_after_favorite(self):
+        if_modified_since = http_date(time.time() + 60)
+        for url in (self.url, '/api/recipes/'):
+            with self.subTest(url=url):
+                response = self.user_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('Last-Modified', response)
+        self.user_client.post(f'{self.url}favorite/')
+
+        response = self.user_client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=if_modified_since)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_favorited'])
+        response = self.user_client.get(
+            '/api/recipes/', HTTP_IF_MODIFIED_SINCE=if_modified_since)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'][0]['is_favorited'])
+
+    def test_anonymous_last_modified(self):
+        response = self.anonymous_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        response = self.anonymous_client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.anonymous_client.get('/api/recipes/')
+        self.assertNotIn('Last-Modified', response)
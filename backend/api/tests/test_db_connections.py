@@ -0,0 +1,115 @@
+from unittest import mock
+
+import psycopg2
+from django.test import SimpleTestCase
+from psycopg2 import extensions
+
+from foodgram.db.postgresql import base
+
+DATABASE_SETTINGS = {
+    'ENGINE': 'foodgram.db.postgresql',
+    'NAME': 'foodgram',
+    'USER': '',
+    'PASSWORD': '',
+    'HOST': '',
+    'PORT': '',
+    'OPTIONS': {},
+    'AUTOCOMMIT': True,
+    'ATOMIC_REQUESTS': False,
+    'CONN_MAX_AGE': 60,
+    'CONN_HEALTH_CHECKS': True,
+    'POOL_SIZE': 0,
+    'TIME_ZONE': None,
+    'TEST': {},
+}
+
+
+def get_mock_connection(*args, **kwargs):
+    """Соединение psycopg2 без сервера БД."""
+    connection = mock.MagicMock(closed=0)
+    cursor = connection.cursor.return_value
+    cursor.__enter__.return_value = cursor
+    connection.get_parameter_status.return_value = 'UTC'
+    connection.get_transaction_status.return_value = (
+        extensions.TRANSACTION_STATUS_IDLE)
+    return connection
+
+
+def get_health_checks(connection):
+    return [call for call in connection.cursor().execute.call_args_list
+            if call == mock.call('SELECT 1')]
+
+
+@mock.patch('psycopg2.extras.register_default_jsonb', mock.Mock())
+class ConnectionReuseTest(SimpleTestCase):
+    """Переиспользование соединений между запросами, проверка соединения
+       перед первым SQL-запросом в запросе (CONN_HEALTH_CHECKS) и пул
+       соединений (POOL_SIZE) в foodgram.db.postgresql."""
+
+    def setUp(self):
+        patcher = mock.patch('psycopg2.connect',
+                             side_effect=get_mock_connection)
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_wrapper(self, **settings):
+        alias = f'test_{self._testMethodName}'
+        self.addCleanup(base._pools.pop, alias, None)
+        return base.DatabaseWrapper({**DATABASE_SETTINGS, **settings}, alias)
+
+    def request(self, wrapper, queries=1):
+        """Запрос к API: в начале запроса Django закрывает устаревшие
+           соединения (close_old_connections), затем выполняет запросы."""
+        wrapper.close_if_unusable_or_obsolete()
+        for _ in range(queries):
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 2')
+
+    def test_connection_reused_and_checked_once_per_request(self):
+        wrapper = self.get_wrapper()
+        self.request(wrapper)
+        connection = wrapper.connection
+        self.assertEqual(get_health_checks(connection), [])
+        self.request(wrapper, queries=3)
+        self.request(wrapper, queries=3)
+        self.assertEqual(self.connect.call_count, 1)
+        self.assertIs(wrapper.connection, connection)
+        self.assertEqual(len(get_health_checks(connection)), 2)
+
+    def test_broken_connection_replaced(self):
+        wrapper = self.get_wrapper()
+        self.request(wrapper)
+        broken = wrapper.connection
+        broken.cursor().execute.side_effect = psycopg2.OperationalError
+        self.request(wrapper)
+        self.assertEqual(self.connect.call_count, 2)
+        broken.close.assert_called_once_with()
+        self.assertIsNot(wrapper.connection, broken)
+
+    def test_health_checks_disabled(self):
+        wrapper = self.get_wrapper(CONN_HEALTH_CHECKS=False)
+        self.request(wrapper)
+        self.request(wrapper)
+        self.assertEqual(self.connect.call_count, 1)
+        self.assertEqual(get_health_checks(wrapper.connection), [])
+
+    def test_pool_reuses_closed_connection(self):
+        wrapper = self.get_wrapper(CONN_MAX_AGE=0, POOL_SIZE=1)
+        self.request(wrapper)
+        connection = wrapper.connection
+        self.request(wrapper)
+        self.assertEqual(self.connect.call_count, 1)
+        self.assertIs(wrapper.connection, connection)
+        connection.close.assert_not_called()
+        self.assertEqual(len(get_health_checks(connection)), 1)
+
+    def test_pool_skips_broken_connection(self):
+        wrapper = self.get_wrapper(CONN_MAX_AGE=0, POOL_SIZE=1)
+        self.request(wrapper)
+        broken = wrapper.connection
+        wrapper.close()
+        broken.cursor().execute.side_effect = psycopg2.OperationalError
+        self.request(wrapper)
+        self.assertEqual(self.connect.call_count, 2)
+        broken.close.assert_called_once_with()
+        self.assertIsNot(wrapper.connection, broken)
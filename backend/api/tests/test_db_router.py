@@ -0,0 +1,106 @@
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import FavoriteRecipes, Recipe
+from .base import RecipesDataMixin, get_image_file
+
+REPLICA = 'replica_0'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTest(RecipesDataMixin, TransactionTestCase):
+    """Чтение в GET-запросах из реплики, запись и чтение пользователем
+       после его изменений - из основной БД. Реплика - отдельная БД SQLite,
+       в которую данные основной БД копируются только методом replicate,
+       поэтому изменения после копирования в ней не видны, как при
+       отставании реплики."""
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        # Варианты картинки строятся после фиксации транзакции
+        if not default_storage.exists('recipes_images/recipe.png'):
+            default_storage.save('recipes_images/recipe.png',
+                                 get_image_file())
+        self.setUpTestData()
+        self.recipe = self.create_recipes(1)[0]
+        super().setUp()
+        self.author_client = self.get_token_client(self.author)
+        self.user_client = self.get_token_client(self.user)
+        self.replicate()
+
+    def get_token_client(self, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        return client
+
+    def replicate(self):
+        """Копия основной БД в реплику."""
+        primary, replica = connections['default'], connections[REPLICA]
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
+
+    def get(self, client, url):
+        """Ответ и SQL-запросы к основной БД и к реплике."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, primary.captured_queries, replica.captured_queries
+
+    def assert_read_from_replica(self, client, url):
+        response, primary, replica = self.get(client, url)
+        self.assertTrue(replica)
+        # Из основной БД читается только токен (PRIMARY_READ_MODELS)
+        self.assertFalse([query['sql'] for query in primary
+                          if 'authtoken_token' not in query['sql']])
+        return response
+
+    def assert_read_from_primary(self, client, url):
+        response, primary, replica = self.get(client, url)
+        self.assertTrue(primary)
+        self.assertFalse(replica)
+        return response
+
+    def test_get_reads_from_replica(self):
+        for client in (self.anonymous_client, self.user_client):
+            for url in ('/api/recipes/', f'/api/recipes/{self.recipe.id}/',
+                        '/api/users/'):
+                with self.subTest(url=url):
+                    self.assert_read_from_replica(client, url)
+
+    def test_write_goes_to_primary(self):
+        response = self.author_client.post(
+            '/api/recipes/', self.get_recipe_data(), format='json')
+        self.assertEqual(response.status_code, 201)
+        recipe_id = response.json()['id']
+        self.assertTrue(Recipe.objects.using('default').filter(
+            id=recipe_id).exists())
+        self.assertFalse(Recipe.objects.using(REPLICA).filter(
+            id=recipe_id).exists())
+
+    def test_user_reads_from_primary_after_write(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        response = self.user_client.post(f'{url}favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(FavoriteRecipes.objects.using(REPLICA).exists())
+
+        response = self.assert_read_from_primary(self.user_client, url)
+        self.assertTrue(response.json()['is_favorited'])
+        # Запросы других пользователей по-прежнему читают из реплики
+        self.assert_read_from_replica(self.author_client, url)
+        self.assert_read_from_replica(self.anonymous_client, url)
+
+        # После DB_REPLICA_STICKY_SECONDS пользователь снова читает из
+        # реплики, которая пока не получила его изменений
+        self.clear_caches()
+        response = self.assert_read_from_replica(self.user_client, url)
+        self.assertFalse(response.json()['is_favorited'])
+        self.replicate()
+        response = self.assert_read_from_replica(self.user_client, url)
+        self.assertTrue(response.json()['is_favorited'])
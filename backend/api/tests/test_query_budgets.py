@@ -0,0 +1,167 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.serializers import ListSerializer, Serializer
+from rest_framework.test import APIClient
+
+from api.serializers import GetRecipeSerializer
+from recipes.models import FavoriteRecipes, ShoppingCart
+from users.models import Subscribers
+from .base import RecipesDataMixin, get_image_file
+
+
+class QueryBudgetsTest(RecipesDataMixin, TestCase):
+    """Кол-во SQL-запросов действий API не превышает QUERY_BUDGETS.
+       Запросы выполняются с авторизацией по токену и с пустыми кэшами,
+       как первый запрос после изменения справочных данных."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipes = cls.create_recipes(8)
+        cls.user_recipes = cls.create_recipes(2, author=cls.user)
+        Subscribers.objects.create(author=cls.author, user=cls.user)
+        FavoriteRecipes.objects.create(recipe=cls.recipes[0], user=cls.user)
+        ShoppingCart.objects.create(recipe=cls.recipes[0], user=cls.user)
+        cls.author_token = Token.objects.create(user=cls.author)
+        cls.user_token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.author_client = APIClient()
+        self.author_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.author_token.key}')
+        self.user_client = APIClient()
+        self.user_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.user_token.key}')
+
+    def assert_within_budget(self, label, client, method, url, data=None,
+                             status=200):
+        self.clear_caches()
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, data, format='json')
+        self.assertEqual(response.status_code, status)
+        budget = settings.QUERY_BUDGETS[label]
+        self.assertLessEqual(
+            len(context.captured_queries), budget,
+            f'{label} {method.upper()} {url}: '
+            f'{len(context.captured_queries)} SQL-запросов при лимите '
+            f'{budget}')
+        return response
+
+    def test_recipes_read(self):
+        recipe = self.recipes[0]
+        for client in (self.anonymous_client, self.user_client):
+            for url in ('/api/recipes/',
+                        '/api/recipes/?tags=tag-0&tags=tag-1',
+                        '/api/recipes/?search=Рецепт',
+                        '/api/recipes/?pagination=cursor',
+                        f'/api/recipes/?author={self.author.id}'):
+                with self.subTest(url=url):
+                    self.assert_within_budget(
+                        'RecipesViewSet.list', client, 'get', url)
+            self.assert_within_budget(
+                'RecipesViewSet.retrieve', client, 'get',
+                f'/api/recipes/{recipe.id}/')
+            self.assert_within_budget(
+                'RecipesViewSet.pantry', client, 'get',
+                '/api/recipes/pantry/?ingredients='
+                f'{self.ingredients[0].id}&ingredients='
+                f'{self.ingredients[1].id}')
+            self.assert_within_budget(
+                'RecipesViewSet.recommendations', client, 'get',
+                '/api/recipes/recommendations/')
+        for url in ('/api/recipes/?is_favorited=1',
+                    '/api/recipes/?is_in_shopping_cart=1'):
+            with self.subTest(url=url):
+                self.assert_within_budget(
+                    'RecipesViewSet.list', self.user_client, 'get', url)
+        self.assert_within_budget(
+            'RecipesViewSet.download_shopping_cart', self.user_client, 'get',
+            '/api/recipes/download_shopping_cart/')
+
+    def test_recipes_write(self):
+        response = self.assert_within_budget(
+            'RecipesViewSet.create', self.author_client, 'post',
+            '/api/recipes/', self.get_recipe_data(), status=201)
+        url = f'/api/recipes/{response.json()["id"]}/'
+        data = self.get_recipe_data(self.tags[1:], self.ingredients[2:6])
+        self.assert_within_budget(
+            'RecipesViewSet.partial_update', self.author_client, 'patch',
+            url, data)
+        self.assert_within_budget(
+            'RecipesViewSet.destroy', self.author_client, 'delete', url,
+            status=204)
+
+    def test_recipe_create_with_image_upload(self):
+        response = self.author_client.post(
+            '/api/recipes/images/', {'image': get_image_file()},
+            format='multipart')
+        self.assertEqual(response.status_code, 201)
+        data = self.get_recipe_data()
+        del data['image']
+        data['image_upload'] = response.json()['id']
+        self.assert_within_budget(
+            'RecipesViewSet.create', self.author_client, 'post',
+            '/api/recipes/', data, status=201)
+
+    def test_favorite_and_shopping_cart(self):
+        recipe = self.recipes[1]
+        for action in ('favorite', 'shopping_cart'):
+            url = f'/api/recipes/{recipe.id}/{action}/'
+            label = f'RecipesViewSet.{action}'
+            self.assert_within_budget(
+                label, self.user_client, 'post', url, status=201)
+            self.assert_within_budget(
+                label, self.user_client, 'delete', url, status=204)
+
+    def test_users(self):
+        self.assert_within_budget(
+            'CustomUserViewSet.list', self.anonymous_client, 'get',
+            '/api/users/')
+        self.assert_within_budget(
+            'CustomUserViewSet.list', self.user_client, 'get', '/api/users/')
+        self.assert_within_budget(
+            'CustomUserViewSet.retrieve', self.user_client, 'get',
+            f'/api/users/{self.author.id}/')
+        self.assert_within_budget(
+            'CustomUserViewSet.me', self.user_client, 'get', '/api/users/me/')
+        self.assert_within_budget(
+            'CustomUserViewSet.subscriptions', self.user_client, 'get',
+            '/api/users/subscriptions/?recipes_limit=2')
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assert_within_budget(
+            'CustomUserViewSet.subscribe', self.user_client, 'delete', url,
+            status=204)
+        self.assert_within_budget(
+            'CustomUserViewSet.subscribe', self.user_client, 'post', url,
+            status=201)
+
+    def test_reference_data(self):
+        self.assert_within_budget(
+            'TagsViewSet.list', self.anonymous_client, 'get', '/api/tags/')
+        for url in ('/api/ingredients/', '/api/ingredients/?name=Ингр'):
+            with self.subTest(url=url):
+                self.assert_within_budget(
+                    'IngredientsViewSet.list', self.anonymous_client, 'get',
+                    url)
+
+
+class SerializerTimingTest(RecipesDataMixin, TestCase):
+    """Время сериализации замеряется только для сериализаторов
+       приложения, классы DRF не меняются."""
+
+    def test_only_app_serializers_timed(self):
+        self.assertTrue(getattr(
+            GetRecipeSerializer.to_representation, 'timed', False))
+        self.assertFalse(getattr(
+            Serializer.to_representation, 'timed', False))
+        self.assertFalse(getattr(
+            ListSerializer.to_representation, 'timed', False))
+
+    def test_server_timing_header(self):
+        self.create_recipes(2)
+        response = self.anonymous_client.get('/api/recipes/')
+        self.assertIn('serialize;dur=', response['Server-Timing'])
@@ -0,0 +1,47 @@
+from django.contrib.auth.signals import user_logged_in
+from django.test import TestCase
+
+from recipes.models import Recipe
+from users.models import User
+from .base import RecipesDataMixin
+
+
+class AuthorRecipesVersionTest(RecipesDataMixin, TestCase):
+    """Версия рецептов автора меняется только при изменении полей
+       профиля, которые входят в представление рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipes(1)[0]
+
+    def get_version(self):
+        return Recipe.objects.values_list(
+            'version', flat=True).get(pk=self.recipe.pk)
+
+    def test_save_without_changes(self):
+        User.objects.get(pk=self.author.pk).save()
+        self.assertEqual(self.get_version(), 1)
+
+    def test_other_fields_changed(self):
+        author = User.objects.get(pk=self.author.pk)
+        author.set_password('new-password')
+        author.save()
+        user_logged_in.send(sender=User, request=None, user=author)
+        self.assertEqual(self.get_version(), 1)
+
+    def test_author_field_changed(self):
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Новое имя'
+        author.save()
+        self.assertEqual(self.get_version(), 2)
+
+    def test_author_field_changed_with_update_fields(self):
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'new-author'
+        author.save(update_fields=['username', 'last_login'])
+        self.assertEqual(self.get_version(), 2)
+
+    def test_user_not_loaded_from_db(self):
+        self.author.save()
+        self.assertEqual(self.get_version(), 2)
@@ -0,0 +1,41 @@
+from django.test import TestCase
+
+from recipes.models import Recipe, RecipeImageUpload
+from .base import RecipesDataMixin, get_image_file
+
+
+class RecipeImageUploadTest(RecipesDataMixin, TestCase):
+    """Рецепт с картинкой, загруженной файлом (поле image_upload)."""
+
+    def upload_image(self, client):
+        response = client.post('/api/recipes/images/',
+                               {'image': get_image_file()},
+                               format='multipart')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def get_recipe_data(self, image_upload):
+        data = super().get_recipe_data()
+        del data['image']
+        data['image_upload'] = image_upload
+        return data
+
+    def test_own_upload_moves_to_recipe(self):
+        image_upload = self.upload_image(self.author_client)
+        image = RecipeImageUpload.objects.get(pk=image_upload).image.name
+        response = self.author_client.post(
+            '/api/recipes/', self.get_recipe_data(image_upload),
+            format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            Recipe.objects.get(pk=response.json()['id']).image.name, image)
+        self.assertFalse(RecipeImageUpload.objects.exists())
+
+    def test_other_user_upload_rejected(self):
+        image_upload = self.upload_image(self.user_client)
+        response = self.author_client.post(
+            '/api/recipes/', self.get_recipe_data(image_upload),
+            format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image_upload', response.json())
+        self.assertTrue(RecipeImageUpload.objects.exists())
@@ -0,0 +1,45 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.filters import RecipesFilter
+from recipes.models import Recipe
+from .base import RecipesDataMixin
+
+
+class RecipesTagsFilterTest(RecipesDataMixin, TestCase):
+    """Фильтр рецептов по нескольким тегам (подзапрос EXISTS): рецепт с
+       несколькими выбранными тегами возвращается один раз."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # У каждого рецепта теги tag-0 и tag-1
+        cls.recipes = cls.create_recipes(4)
+
+    def get_recipes(self, tags):
+        query = '&'.join(f'tags={tag.slug}' for tag in tags)
+        response = self.anonymous_client.get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_multiple_tags_without_duplicates(self):
+        data = self.get_recipes(self.tags[:2])
+        ids = [recipe['id'] for recipe in data['results']]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(data['count'], len(self.recipes))
+        self.assertEqual(len(data['results']), len(self.recipes))
+
+    def test_queries_do_not_depend_on_tags_count(self):
+        # Справочные данные (id тегов по slug) кэшируются первым запросом.
+        self.get_recipes(self.tags[:1])
+        with CaptureQueriesContext(connection) as context:
+            self.get_recipes(self.tags[:1])
+        with self.assertNumQueries(len(context.captured_queries)):
+            self.get_recipes(self.tags)
+
+    def test_deleted_tag_skipped(self):
+        recipes_filter = RecipesFilter(queryset=Recipe.objects.all())
+        queryset = recipes_filter.filter_tags(
+            Recipe.objects.all(), 'tags', [self.tags[0].slug, 'deleted'])
+        self.assertEqual(queryset.count(), len(self.recipes))
@@ -0,0 +1,53 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import recipe_fragments
+from recipes.models import Recipe
+from .base import RecipesDataMixin
+
+
+class RecipesListQueriesTest(RecipesDataMixin, TestCase):
+    """Кол-во SQL-запросов списка рецептов не зависит от кол-ва рецептов
+       на странице."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.create_recipes(8)
+        cls.create_recipes(4, author=cls.user)
+
+    def get_page(self, client, url, limit):
+        # Сериализованные рецепты из кэша не обращаются к БД.
+        recipe_fragments.clear()
+        response = client.get(f'{url}limit={limit}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), limit)
+        return response
+
+    def assert_constant_queries(self, client, url):
+        # Справочные данные (id тегов по slug) кэшируются первым запросом.
+        self.get_page(client, url, 1)
+        with CaptureQueriesContext(connection) as context:
+            self.get_page(client, url, 1)
+        with self.assertNumQueries(len(context.captured_queries)):
+            self.get_page(client, url, 10)
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        for name, client in (('anonymous', self.anonymous_client),
+                             ('user', self.user_client)):
+            for url in ('/api/recipes/?',
+                        '/api/recipes/?tags=tag-0&',
+                        '/api/recipes/?pagination=cursor&',
+                        '/api/recipes/?is_favorited=0&'):
+                with self.subTest(client=name, url=url):
+                    self.assert_constant_queries(client, url)
+
+    def test_with_related_loads_page_in_fixed_queries(self):
+        for limit in (1, 10):
+            with self.subTest(limit=limit), self.assertNumQueries(3):
+                for recipe in Recipe.objects.with_related()[:limit]:
+                    recipe.author.username
+                    [tag.slug for tag in recipe.tags.all()]
+                    [item.ingredients.name
+                     for item in recipe.recipeingredients.all()]
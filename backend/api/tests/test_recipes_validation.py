@@ -0,0 +1,75 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import AddRecipeSerializer
+from recipes.models import Recipe
+from .base import RecipesDataMixin
+
+
+class RecipeCreateValidationTest(RecipesDataMixin, TestCase):
+    """Проверка тегов и ингредиентов рецепта, загружаемых из БД одним
+       запросом (BulkManyRelatedField, AddRecipeIngredientListSerializer)."""
+    ingredients_count = 20
+
+    def post_recipe(self, data):
+        return self.author_client.post('/api/recipes/', data, format='json')
+
+    def assert_rejected(self, data, field):
+        response = self.post_recipe(data)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(field, response.json())
+        self.assertFalse(Recipe.objects.exists())
+        return response.json()[field]
+
+    def test_duplicate_tags(self):
+        data = self.get_recipe_data(tags=[self.tags[0], self.tags[0]])
+        self.assert_rejected(data, 'non_field_errors')
+
+    def test_duplicate_ingredients(self):
+        data = self.get_recipe_data(
+            ingredients=[self.ingredients[0], self.ingredients[0]])
+        self.assert_rejected(data, 'non_field_errors')
+
+    def test_unknown_tag(self):
+        data = self.get_recipe_data()
+        data['tags'] = [self.tags[0].id, 999]
+        errors = self.assert_rejected(data, 'tags')
+        self.assertIn('999', errors[0])
+
+    def test_invalid_tag_id(self):
+        data = self.get_recipe_data()
+        data['tags'] = [self.tags[0].id, 'tag']
+        self.assert_rejected(data, 'tags')
+
+    def test_unknown_ingredient(self):
+        data = self.get_recipe_data()
+        data['ingredients'].append({'id': 999, 'amount': 10})
+        errors = self.assert_rejected(data, 'ingredients')
+        self.assertEqual(errors[:-1], [{}] * (len(errors) - 1))
+        self.assertIn('999', errors[-1]['id'][0])
+
+    def test_validation_queries_do_not_depend_on_items_count(self):
+        request = APIRequestFactory().post('/api/recipes/')
+        request.user = self.author
+        for tags, ingredients in ((self.tags[:1], self.ingredients[:1]),
+                                  (self.tags, self.ingredients)):
+            serializer = AddRecipeSerializer(
+                data=self.get_recipe_data(tags, ingredients),
+                context={'request': request})
+            with self.subTest(ingredients=len(ingredients)), \
+                    self.assertNumQueries(2):
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_create_queries_do_not_depend_on_items_count(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.post_recipe(self.get_recipe_data(
+                self.tags[:1], self.ingredients[:1]))
+        self.assertEqual(response.status_code, 201)
+        with self.assertNumQueries(len(context.captured_queries)):
+            response = self.post_recipe(self.get_recipe_data(
+                self.tags, self.ingredients))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['ingredients']),
+                         len(self.ingredients))
@@ -0,0 +1,118 @@
+import datetime
+import decimal
+import io
+import unittest
+import uuid
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from api.renderers import ORJSONParser, ORJSONRenderer, orjson
+from api.serializers import GetRecipeSerializer, IngredientSerializer
+from recipes.models import Ingredient, Recipe
+from .base import RecipesDataMixin
+
+
+def get_special_values():
+    """Значения, которые JSONRenderer DRF кодирует JSONEncoder: ответы API
+       должны остаться прежними и для них."""
+    moscow = datetime.timezone(datetime.timedelta(hours=3))
+    return ReturnDict({
+        'decimal': decimal.Decimal('12.50'),
+        'utc': datetime.datetime(2022, 1, 2, 3, 4, 5, 678901,
+                                 tzinfo=datetime.timezone.utc),
+        'aware': datetime.datetime(2022, 1, 2, 3, 4, 5, tzinfo=moscow),
+        'naive': datetime.datetime(2022, 1, 2, 3, 4, 5),
+        'now': timezone.now(),
+        'date': datetime.date(2022, 1, 2),
+        'time': datetime.time(3, 4, 5, 6),
+        'timedelta': datetime.timedelta(minutes=90),
+        'uuid': uuid.UUID(int=1),
+        'lazy': gettext_lazy('Рецепт'),
+        'separators': 'строка\u2028абзац\u2029',
+        'keys': {1: 'int', None: 'null'},
+        'bytes': b'bytes',
+        'list': ReturnList([1, 2.5, None, 'текст'], serializer=None),
+        'tuple': (1, 2),
+        'float': 0.1,
+    }, serializer=None)
+
+
+class JSONCompatibilityMixin:
+
+    def assert_compatible(self, data):
+        """Ответ и разобранные данные совпадают с JSONRenderer и
+           JSONParser DRF."""
+        expected = JSONRenderer().render(data)
+        content = ORJSONRenderer().render(data)
+        self.assertEqual(content, expected)
+        parsed = JSONParser().parse(io.BytesIO(expected))
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(content)), parsed)
+
+
+@unittest.skipIf(orjson is None, 'orjson не установлен')
+class ORJSONRendererTest(JSONCompatibilityMixin, RecipesDataMixin,
+                         TestCase):
+    """ORJSONRenderer и ORJSONParser совместимы с JSON DRF."""
+
+    def test_special_values(self):
+        self.assert_compatible(get_special_values())
+
+    def test_api_responses(self):
+        self.create_recipes(3)
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        recipes = Recipe.objects.with_related().with_user_flags(request.user)
+        for name, data in (
+                ('recipes', GetRecipeSerializer(
+                    recipes, many=True, context={'request': request}).data),
+                ('recipe', GetRecipeSerializer(
+                    recipes[0], context={'request': request}).data),
+                ('ingredients', IngredientSerializer(
+                    Ingredient.objects.all(), many=True).data)):
+            with self.subTest(name=name):
+                self.assert_compatible(data)
+
+    def test_big_integers(self):
+        self.assert_compatible({'big': 2 ** 70, 'values': [1, 2]})
+
+    def test_exponent_floats(self):
+        data = {'small': 1e-7, 'large': 1e16}
+        content = ORJSONRenderer().render(data)
+        self.assertEqual(
+            ORJSONParser().parse(io.BytesIO(content)),
+            JSONParser().parse(io.BytesIO(JSONRenderer().render(data))))
+
+    def test_parser_fallback(self):
+        for content in (b'{"big": 1180591620717411303424}',
+                        '{"name": "Рецепт"}'.encode('cp1251')):
+            with self.subTest(content=content):
+                context = {'encoding': 'cp1251'}
+                self.assertEqual(
+                    ORJSONParser().parse(io.BytesIO(content),
+                                         parser_context=context),
+                    JSONParser().parse(io.BytesIO(content),
+                                       parser_context=context))
+
+    def test_parser_errors(self):
+        for content in (b'{"value": NaN}', b'{"value": '):
+            with self.subTest(content=content):
+                with self.assertRaises(ParseError):
+                    JSONParser().parse(io.BytesIO(content))
+                with self.assertRaises(ParseError):
+                    ORJSONParser().parse(io.BytesIO(content))
+
+
+@mock.patch('api.renderers.orjson', None)
+class JSONFallbackTest(JSONCompatibilityMixin, TestCase):
+    """Без orjson используется стандартный модуль json."""
+
+    def test_special_values(self):
+        self.assert_compatible(get_special_values())
@@ -0,0 +1,55 @@
+import uuid
+
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework.exceptions import ValidationError
+
+from foodgram.constants import (RECIPE_IMAGE_UPLOAD_CHUNK_SIZE,
+                                RECIPE_IMAGE_UPLOAD_MAX_SIZE)
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+
+def get_image_extension(data):
+    """Расширение картинки по сигнатуре в начале файла."""
+    for signature, extension in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class RecipeImageUploadHandler(TemporaryFileUploadHandler):
+    """Потоковая загрузка картинки рецепта во временный файл по частям.
+       Размер файла ограничен, тип файла проверяется по первому
+       фрагменту, до получения остальных данных."""
+    chunk_size = RECIPE_IMAGE_UPLOAD_CHUNK_SIZE
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > RECIPE_IMAGE_UPLOAD_MAX_SIZE + self.chunk_size:
+            raise ValidationError(
+                {'image': 'Превышен допустимый размер файла!'})
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0:
+            extension = get_image_extension(raw_data)
+            if extension is None:
+                raise ValidationError(
+                    {'image': 'Загрузите картинку в формате JPEG, PNG, '
+                              'GIF или WebP!'})
+            self.file.name = f'{uuid.uuid4()}.{extension}'
+        self.received += len(raw_data)
+        if self.received > RECIPE_IMAGE_UPLOAD_MAX_SIZE:
+            raise ValidationError(
+                {'image': 'Превышен допустимый размер файла!'})
+        return super().receive_data_chunk(raw_data, start)
@@ -0,0 +1,90 @@
+import csv
+import io
+
+from django.conf import settings
+from django.db.models import Sum
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from foodgram.constants import (SHOPPING_CART_PDF_FONT_SIZE,
+                                SHOPPING_CART_TITLE)
+from recipes.models import RecipeIngredient
+
+
+def get_shopping_cart_ingredients(user):
+    """Суммарное кол-во каждого ингредиента из списка покупок
+       пользователя. Суммирование выполняется в БД одним запросом."""
+    return RecipeIngredient.objects.filter(
+        recipe__shoppingcarts__user=user
+    ).values(
+        'ingredients__name',
+        'ingredients__measurement_unit'
+    ).annotate(
+        amount=Sum('amount')
+    ).order_by('ingredients__name')
+
+
+def shopping_cart_to_txt(ingredients):
+    """Список покупок в текстовом формате."""
+    lines = [SHOPPING_CART_TITLE]
+    lines.extend(
+        f'{ingredient["ingredients__name"]} - {ingredient["amount"]}'
+        f'({ingredient["ingredients__measurement_unit"]}).'
+        for ingredient in ingredients)
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def shopping_cart_to_csv(ingredients):
+    """Список покупок в формате CSV."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(('Ингредиент', 'Количество', 'Единицы измерения'))
+    for ingredient in ingredients:
+        writer.writerow((ingredient['ingredients__name'],
+                         ingredient['amount'],
+                         ingredient['ingredients__measurement_unit']))
+    return buffer.getvalue().encode()
+
+
+def get_pdf_font():
+    """Регистрирует шрифт с поддержкой кириллицы при первом обращении."""
+    font_name = 'ShoppingCartFont'
+    if font_name not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(font_name, settings.SHOPPING_CART_PDF_FONT))
+    return font_name
+
+
+def shopping_cart_to_pdf(ingredients):
+    """Список покупок в формате PDF."""
+    buffer = io.BytesIO()
+    font_name = get_pdf_font()
+    line_height = SHOPPING_CART_PDF_FONT_SIZE * 1.5
+    margin = 50
+    width, height = A4
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setFont(font_name, SHOPPING_CART_PDF_FONT_SIZE)
+    position = height - margin
+    lines = [SHOPPING_CART_TITLE]
+    lines.extend(
+        f'• {ingredient["ingredients__name"]} - {ingredient["amount"]} '
+        f'{ingredient["ingredients__measurement_unit"]}'
+        for ingredient in ingredients)
+    for line in lines:
+        if position < margin:
+            pdf.showPage()
+            pdf.setFont(font_name, SHOPPING_CART_PDF_FONT_SIZE)
+            position = height - margin
+        pdf.drawString(margin, position, line)
+        position -= line_height
+    pdf.save()
+    return buffer.getvalue()
+
+
+SHOPPING_CART_RENDERERS = {
+    'txt': (shopping_cart_to_txt, 'text/plain; charset=utf-8'),
+    'csv': (shopping_cart_to_csv, 'text/csv; charset=utf-8'),
+    'pdf': (shopping_cart_to_pdf, 'application/pdf'),
+}
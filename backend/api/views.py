@@ -1,45 +1,90 @@
-from django.db.models import F
-from django.http import FileResponse
+import io
+
+from django.db.models import (Exists, OuterRef, Prefetch,
+                              prefetch_related_objects)
+from django.http import FileResponse, HttpResponse
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from foodgram.constants import (PAGINATION_MODE_HEADER,
+                                RECIPES_CACHE_MAX_AGE,
+                                RECIPES_REPRESENTATION_VERSION,
+                                SHOPPING_CART_DEFAULT_FORMAT,
+                                SHOPPING_CART_FILENAME,
+                                SHOPPING_CART_FORMAT_PARAM)
 from recipes.models import (FavoriteRecipes, Ingredient, Recipe,
                             ShoppingCart, Tag)
 from users.models import Subscribers, User
+from .cache import recipe_fragments
 from .filters import IngredientsFilter, RecipesFilter
+from .mixins import ConditionalGetMixin, ReferenceCacheMixin
 from .paginations import Pagination
+from .pantry import pantry_index
+from .recommendations import get_recommended_ids
 from .permissions import IsAuthorAdminOrReadOnly
+from .profiling import metrics_registry
 from .serializers import (AddRecipeSerializer, FavoriteRecipesSerializer,
                           GetRecipeSerializer, IngredientSerializer,
+                          PantryQuerySerializer, PantryRecipeSerializer,
+                          RecipeImageUploadSerializer, RecipesLimitSerializer,
+                          RecommendationsQuerySerializer,
                           ShoppingCartSerializer, SubscribeSerializer,
                           SubscriptionsListSerializer, TagSerializer)
+from .uploads import RecipeImageUploadHandler
+from .utils import SHOPPING_CART_RENDERERS, get_shopping_cart_ingredients
 
 
 class CustomUserViewSet(UserViewSet):
     """Вьюсет для модели Пользователя."""
     pagination_class = Pagination
 
+    def get_queryset(self):
+        """Признак подписки текущего пользователя считается для всей
+           страницы пользователей в одном запросе."""
+        queryset = super().get_queryset()
+        user = self.request.user
+        if self.request.method == 'GET' and user.is_authenticated:
+            return queryset.annotate(user_subscribed=Exists(
+                Subscribers.objects.filter(author=OuterRef('pk'),
+                                           user=user)))
+        return queryset
+
     def get_permissions(self):
         """Настройка разрешений."""
         if self.action == 'me':
             self.permission_classes = [IsAuthenticated, ]
         return super(UserViewSet, self).get_permissions()
 
+    def get_recipes_limit(self, request):
+        """Проверенное значение параметра recipes_limit."""
+        serializer = RecipesLimitSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes_limit']
+
     @action(methods=['GET'],
             detail=False,
             permission_classes=[IsAuthenticated, ])
     def subscriptions(self, request):
         """Возвращает список авторов рецептов, на которых подписан текущий
-           пользователь. В выдачу добавляются рецепты авторов и их кол-во."""
-        subscriptions = Subscribers.objects.filter(user=request.user)
+           пользователь. В выдачу добавляются рецепты авторов и их кол-во.
+           Рецепты всех авторов страницы выбираются одним запросом."""
+        recipes_limit = self.get_recipes_limit(request)
+        subscriptions = Subscribers.objects.filter(
+            user=request.user).select_related('author')
         pages = self.paginate_queryset(subscriptions)
-        serializer = SubscriptionsListSerializer(pages,
-                                                 many=True,
-                                                 context={'request': request})
+        prefetch_related_objects(pages, Prefetch(
+            'author__recipes',
+            queryset=Recipe.objects.latest_per_author(recipes_limit),
+            to_attr='recipes_preview'))
+        serializer = SubscriptionsListSerializer(
+            pages,
+            many=True,
+            context={'request': request, 'recipes_limit': recipes_limit})
         return self.get_paginated_response(serializer.data)
 
     @action(methods=['POST', 'DELETE'],
@@ -52,8 +97,10 @@ class CustomUserViewSet(UserViewSet):
         data = {'author': author.id,
                 'user': request.user.id}
         if request.method == 'POST':
-            serializer = SubscribeSerializer(data=data,
-                                             context={'request': request})
+            serializer = SubscribeSerializer(
+                data=data,
+                context={'request': request,
+                         'recipes_limit': self.get_recipes_limit(request)})
             serializer.is_valid(raise_exception=True)
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -67,65 +114,155 @@ class CustomUserViewSet(UserViewSet):
                             status=status.HTTP_400_BAD_REQUEST)
 
 
-class TagsViewSet(viewsets.ModelViewSet):
+class TagsViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
     """Вьюсет для модели Тэгов."""
+    cache_namespace = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
     http_method_names = ['get', ]
 
 
-class IngredientsViewSet(viewsets.ModelViewSet):
+class IngredientsViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
     """Вьюсет для модели Ингридиентов."""
+    cache_namespace = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     permission_classes = (AllowAny,)
     filter_backends = (IngredientsFilter,)
-    search_fields = ('^name',)
     http_method_names = ['get', ]
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Вьюсет для модели Рецептов."""
     queryset = Recipe.objects.all()
     serializer_class = GetRecipeSerializer
     pagination_class = Pagination
     permission_classes = (IsAuthorAdminOrReadOnly,)
     filterset_class = RecipesFilter
+    cursor_ordering = ('-pub_date', '-id')
+    # Поиск сортирует рецепты по релевантности, курсор - по дате.
+    ranked_query_params = ('search',)
+    # Поля рецепта и автора, от которых зависит ответ (pub_date нужен
+    # курсорной пагинации), теги и ингредиенты - по версиям их кэша.
+    etag_fields = (
+        'pk', 'version', 'modified_at', 'pub_date', 'author_id',
+        'author__email', 'author__username', 'author__first_name',
+        'author__last_name', 'user_favorited', 'user_in_shopping_cart',
+        'user_subscribed',
+    )
+    etag_namespaces = ('tags', 'ingredients')
+    etag_version = RECIPES_REPRESENTATION_VERSION
+    vary_headers = ('Authorization', PAGINATION_MODE_HEADER)
+    cache_max_age = RECIPES_CACHE_MAX_AGE
+
+    def get_queryset(self):
+        """Признаки избранного, списка покупок и подписки считаются
+           для всей страницы в одном запросе, связанные данные
+           подгружаются заранее только для чтения рецептов."""
+        queryset = super().get_queryset().with_user_flags(self.request.user)
+        if self.request.method == 'GET':
+            return queryset.with_related()
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return GetRecipeSerializer
         return AddRecipeSerializer
 
+    @action(methods=['POST'],
+            detail=False,
+            permission_classes=[IsAuthenticated, ],
+            parser_classes=[MultiPartParser, ],
+            url_path='images')
+    def upload_image(self, request):
+        """Загрузка картинки рецепта файлом (multipart/form-data, поле
+           image). Файл принимается по частям во временный файл, в ответе
+           id загрузки для поля image_upload рецепта."""
+        request.upload_handlers = [
+            RecipeImageUploadHandler(request._request)]
+        serializer = RecipeImageUploadSerializer(
+            data=request.data,
+            context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save(author=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['GET'],
+            detail=False,
+            permission_classes=[AllowAny, ])
+    def pantry(self, request):
+        """Подбор рецептов по имеющимся продуктам: параметр ingredients -
+           id ингредиентов (можно несколько). Рецепты отсортированы по
+           доле имеющихся ингредиентов, для каждого указаны недостающие.
+           Подбор выполняется по индексу в памяти, из БД загружаются
+           только найденные рецепты и недостающие ингредиенты."""
+        params = PantryQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        matches = pantry_index.match(params.validated_data['ingredients'],
+                                     params.validated_data['limit'])
+        recipes = Recipe.objects.defer('search_vector').in_bulk(
+            [match.recipe_id for match in matches])
+        ingredients = Ingredient.objects.in_bulk(
+            {ingredient_id for match in matches
+             for ingredient_id in match.missing})
+        results = []
+        for match in matches:
+            recipe = recipes.get(match.recipe_id)
+            if recipe is None:
+                continue
+            recipe.coverage = match.matched / match.total
+            recipe.matched_count = match.matched
+            recipe.ingredients_count = match.total
+            recipe.missing_ingredients = [
+                ingredients[ingredient_id] for ingredient_id in match.missing
+                if ingredient_id in ingredients]
+            results.append(recipe)
+        serializer = PantryRecipeSerializer(
+            results, many=True, context={'request': request})
+        return Response(serializer.data)
+
+    @action(methods=['GET'],
+            detail=False,
+            permission_classes=[AllowAny, ])
+    def recommendations(self, request):
+        """Рекомендованные рецепты, не более limit. Рекомендации строятся
+           по заранее рассчитанной таблице похожих рецептов и кэшируются
+           для каждого пользователя, анонимному пользователю выдаются
+           популярные рецепты."""
+        params = RecommendationsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        recipe_ids = get_recommended_ids(
+            request.user)[:params.validated_data['limit']]
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = GetRecipeSerializer(
+            [recipes[recipe_id] for recipe_id in recipe_ids
+             if recipe_id in recipes],
+            many=True,
+            context=self.get_serializer_context())
+        return Response(serializer.data)
+
     @action(methods=['GET'],
             detail=False,
             permission_classes=[IsAuthenticated, ])
     def download_shopping_cart(self, request):
-        """Скачать файл со списком покупок. Формат файла: file.txt"""
-        shoppingcart = ShoppingCart.objects.filter(
-            user=request.user).values('recipe_id__ingredients__name').annotate(
-                amount=F('recipe_id__recipeingredients__amount'),
-                measurement_unit=F('recipe_id__ingredients__measurement_unit')
-        ).order_by('recipe_id__ingredients__name')
-        ingredients = {}
-        for ingredient in shoppingcart:
-            ingredient_name = ingredient['recipe_id__ingredients__name']
-            amount = ingredient['amount']
-            measurement_unit = ingredient['measurement_unit']
-            if ingredient_name not in ingredients:
-                ingredients[ingredient_name] = (amount, measurement_unit)
-            else:
-                ingredients[ingredient_name] = (
-                    ingredients[ingredient_name][0] + amount,
-                    measurement_unit)
-        with open("shopping_cart.txt", "w") as file:
-            file.write('Ваш список покупок:' + '\n')
-            for ingredient, amount in ingredients.items():
-                file.write(f'{ingredient} - {amount[0]}({amount[1]}).' + '\n')
-            file.close()
-        return FileResponse(open('shopping_cart.txt', 'rb'))
+        """Скачать файл со списком покупок. Формат файла задается
+           параметром type: txt (по умолчанию), csv или pdf."""
+        file_format = request.query_params.get(
+            SHOPPING_CART_FORMAT_PARAM, SHOPPING_CART_DEFAULT_FORMAT)
+        if file_format not in SHOPPING_CART_RENDERERS:
+            return Response(
+                {'errors': 'Поддерживаемые форматы: '
+                           f'{", ".join(SHOPPING_CART_RENDERERS)}.'},
+                status=status.HTTP_400_BAD_REQUEST)
+        render, content_type = SHOPPING_CART_RENDERERS[file_format]
+        content = render(get_shopping_cart_ingredients(request.user))
+        return FileResponse(
+            io.BytesIO(content),
+            as_attachment=True,
+            filename=f'{SHOPPING_CART_FILENAME}.{file_format}',
+            content_type=content_type)
 
     @action(methods=['POST', 'DELETE'],
             detail=False,
@@ -196,3 +333,11 @@ class RecipesViewSet(viewsets.ModelViewSet):
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response({'errors': 'Рецепт не найден в списке покупок.'},
                             status=status.HTTP_400_BAD_REQUEST)
+
+
+def metrics(request):
+    """Метрики запросов к API и кэша рецептов в текстовом формате
+       Prometheus."""
+    return HttpResponse(metrics_registry.render() + recipe_fragments.render(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
@@ -8,3 +8,86 @@ NAME_MAX_LENGTH = 150
 TEXT_MAX_LENGTH = 200
 # Default pagination size!
 DEFAULT_PAGES_LIMIT = 6
+
+# Shopping cart download settings!
+SHOPPING_CART_FILENAME = 'shopping_cart'
+SHOPPING_CART_FORMAT_PARAM = 'type'
+SHOPPING_CART_DEFAULT_FORMAT = 'txt'
+SHOPPING_CART_TITLE = 'Ваш список покупок:'
+SHOPPING_CART_PDF_FONT_SIZE = 12
+
+# Max number of ingredients in autocomplete results!
+INGREDIENTS_SEARCH_LIMIT = 20
+
+# Cache alias for reference data (tags, ingredients)!
+REFERENCE_CACHE_ALIAS = 'reference'
+
+# Cursor pagination mode switch (query param or header)!
+PAGINATION_MODE_PARAM = 'pagination'
+PAGINATION_MODE_HEADER = 'X-Pagination'
+
+# Recipe image variants: name -> max (width, height)!
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (480, 480),
+    'detail': (1200, 1200),
+}
+RECIPE_IMAGE_QUALITY = 85
+RECIPE_IMAGE_WEBP_QUALITY = 80
+
+# Recipe image file upload limits!
+RECIPE_IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# PostgreSQL text search configuration for recipes!
+SEARCH_CONFIG = 'russian'
+
+# "Cook from pantry" recipe matcher settings!
+PANTRY_RESULTS_LIMIT = 20
+PANTRY_MAX_RESULTS_LIMIT = 100
+PANTRY_INDEX_REBUILD_INTERVAL = 60 * 60
+PANTRY_MAX_PENDING_CHANGES = 1000
+PANTRY_CHANGES_TIMEOUT = 24 * 60 * 60
+
+# Recipe recommendations model settings!
+RECOMMENDATIONS_NEIGHBORS = 20
+RECOMMENDATIONS_FAVORITE_WEIGHT = 1.0
+RECOMMENDATIONS_CART_WEIGHT = 0.5
+RECOMMENDATIONS_INTERACTIONS_WEIGHT = 0.6
+RECOMMENDATIONS_INGREDIENTS_WEIGHT = 0.3
+RECOMMENDATIONS_TAGS_WEIGHT = 0.1
+RECOMMENDATIONS_MAX_USER_ITEMS = 500
+RECOMMENDATIONS_MAX_INGREDIENT_RECIPES = 1000
+RECOMMENDATIONS_BATCH_SIZE = 256
+# Recipe recommendations serving settings!
+RECOMMENDATIONS_SEED_LIMIT = 50
+RECOMMENDATIONS_CACHE_SIZE = 100
+RECOMMENDATIONS_MAX_RESULTS_LIMIT = 50
+
+# HTTP caching of recipe responses: max-age for anonymous responses (shared
+# caches like nginx) and representation version, bump it when the recipe
+# serializer output changes to invalidate ETags!
+RECIPES_CACHE_MAX_AGE = 10
+RECIPES_REPRESENTATION_VERSION = 1
+
+# Response compression: minimum body size, compressed content types and
+# compression levels for API responses and precompressed static files!
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CONTENT_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'text/',
+)
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
+STATIC_COMPRESSION_EXTENSIONS = (
+    '.css', '.html', '.js', '.json', '.map', '.svg', '.txt', '.xml', '.yml',
+)
+STATIC_COMPRESSION_GZIP_LEVEL = 9
+STATIC_COMPRESSION_BROTLI_QUALITY = 11
+
+# Read replicas: seconds a replica is skipped after a failed connection and
+# cache key prefix for users who recently wrote to the primary database!
+DB_REPLICA_RETRY_INTERVAL = 30
+DB_PRIMARY_STICKY_KEY = 'db:primary:user:{}'
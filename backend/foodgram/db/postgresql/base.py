@@ -0,0 +1,127 @@
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+from psycopg2 import extensions
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Свободные соединения процесса с БД. Соединение берется из пула
+       вместо нового подключения и возвращается в пул вместо закрытия.
+       Общее кол-во соединений пул не ограничивает, свободных хранится
+       не больше size."""
+
+    def __init__(self, size):
+        self.size = size
+        self.pid = os.getpid()
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def check_fork(self):
+        """Соединения родительского процесса после fork не используются и
+           не закрываются: их сокеты общие с родителем."""
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self._idle = []
+
+    def get(self):
+        """Свободное соединение и его уровень изоляции или (None, None)."""
+        with self._lock:
+            self.check_fork()
+            while self._idle:
+                connection, isolation_level = self._idle.pop()
+                if not connection.closed:
+                    return connection, isolation_level
+        return None, None
+
+    def put(self, connection, isolation_level):
+        with self._lock:
+            self.check_fork()
+            if len(self._idle) < self.size:
+                self._idle.append((connection, isolation_level))
+                return
+        connection.close()
+
+
+def get_pool(alias, size):
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(size)
+        return _pools[alias]
+
+
+def is_connection_usable(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except base.Database.Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с проверкой соединения перед повторным использованием
+       (CONN_HEALTH_CHECKS, как в Django 4.1) и необязательным пулом
+       соединений процесса (POOL_SIZE). Без этих настроек работает как
+       стандартный бэкенд."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_enabled = self.settings_dict.get(
+            'CONN_HEALTH_CHECKS', False)
+        self.health_check_done = False
+        pool_size = self.settings_dict.get('POOL_SIZE', 0)
+        self.pool = get_pool(self.alias, pool_size) if pool_size else None
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        if self.pool is not None:
+            connection, isolation_level = self.pool.get()
+            while connection is not None:
+                if (not self.health_check_enabled
+                        or is_connection_usable(connection)):
+                    self.isolation_level = isolation_level
+                    return connection
+                connection.close()
+                connection, isolation_level = self.pool.get()
+        return super().get_new_connection(conn_params)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_health_check_failed(self):
+        """Закрытие соединения, оставшегося с прошлого запроса, если оно
+           разорвано (например, после перезапуска БД или PgBouncer).
+           Проверка выполняется один раз за запрос, перед первым
+           SQL-запросом."""
+        if (self.connection is None or not self.health_check_enabled
+                or self.health_check_done):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def _close(self):
+        """Возврат соединения в пул, если вне транзакции оно свободно.
+           Соединения в транзакции и разорванные закрываются."""
+        if (self.pool is not None and self.connection is not None
+                and not self.in_atomic_block
+                and not self.connection.closed
+                and self.connection.get_transaction_status()
+                == extensions.TRANSACTION_STATUS_IDLE):
+            self.pool.put(self.connection, self.isolation_level)
+            return
+        super()._close()
@@ -0,0 +1,133 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.functional import LazyObject, empty
+
+from foodgram.constants import (DB_PRIMARY_STICKY_KEY,
+                                DB_REPLICA_RETRY_INTERVAL,
+                                REFERENCE_CACHE_ALIAS)
+
+# Модели, которые всегда читаются из основной БД: токен, созданный при
+# входе, должен находиться сразу, даже если реплика отстает.
+PRIMARY_READ_MODELS = ('authtoken.token', 'sessions.session')
+
+current_routing = ContextVar('current_routing', default=None)
+
+_unavailable = {}
+_unavailable_lock = threading.Lock()
+
+
+def get_replicas():
+    return list(settings.DATABASE_REPLICAS)
+
+
+def get_sticky_cache():
+    """Кэш отметок о недавней записи пользователей. Должен быть общим для
+       всех процессов (REFERENCE_CACHE_BACKEND), иначе после записи в
+       одном воркере чтение в другом может попасть на реплику."""
+    return caches[REFERENCE_CACHE_ALIAS]
+
+
+def mark_unavailable(alias):
+    with _unavailable_lock:
+        _unavailable[alias] = time.monotonic() + DB_REPLICA_RETRY_INTERVAL
+
+
+def is_available(alias):
+    """Реплика доступна, если к ней удается подключиться. После ошибки
+       подключения реплика пропускается DB_REPLICA_RETRY_INTERVAL
+       секунд."""
+    with _unavailable_lock:
+        if _unavailable.get(alias, 0) > time.monotonic():
+            return False
+    connection = connections[alias]
+    try:
+        # Проверка соединения, оставшегося с прошлого запроса
+        # (CONN_HEALTH_CHECKS в foodgram/db/postgresql).
+        if hasattr(connection, 'close_if_health_check_failed'):
+            connection.close_if_health_check_failed()
+        connection.ensure_connection()
+    except DatabaseError:
+        mark_unavailable(alias)
+        return False
+    return True
+
+
+def mark_primary_sticky(user):
+    """Чтение из основной БД для пользователя в течение
+       DB_REPLICA_STICKY_SECONDS после изменения им данных."""
+    get_sticky_cache().set(DB_PRIMARY_STICKY_KEY.format(user.pk), True,
+                           settings.DB_REPLICA_STICKY_SECONDS)
+
+
+class RequestRouting:
+    """Выбор БД для чтения в одном запросе к API. Реплика выбирается при
+       первом чтении и не меняется до конца запроса."""
+
+    def __init__(self, request, primary=False):
+        self.request = request
+        self.primary = primary
+        self.replica = None
+        self.sticky_user = None
+
+    def is_sticky(self):
+        """Пользователь недавно изменял данные. Пользователь запроса
+           известен только после аутентификации DRF, поэтому проверка
+           выполняется при чтении, а не в начале запроса."""
+        user = getattr(self.request, 'user', None)
+        # Пользователь сессии загружается из БД при первом обращении,
+        # которое может быть внутри этого же чтения.
+        if isinstance(user, LazyObject) and user._wrapped is empty:
+            return False
+        if user is None or not user.is_authenticated:
+            return False
+        if self.sticky_user != user.pk:
+            self.sticky_user = user.pk
+            self.primary = bool(get_sticky_cache().get(
+                DB_PRIMARY_STICKY_KEY.format(user.pk)))
+        return self.primary
+
+    def get_read_alias(self):
+        # Внутри транзакции читаются данные, записанные в этой же
+        # транзакции.
+        if (self.primary or connections[DEFAULT_DB_ALIAS].in_atomic_block
+                or self.is_sticky()):
+            return DEFAULT_DB_ALIAS
+        if self.replica is None:
+            replicas = get_replicas()
+            random.shuffle(replicas)
+            self.replica = next(
+                (alias for alias in replicas if is_available(alias)),
+                DEFAULT_DB_ALIAS)
+        return self.replica
+
+
+class ReplicaRouter:
+    """Чтение в GET-запросах к API из реплик (DB_REPLICAS в настройках),
+       все остальное - в основной БД: запись, чтение в запросах, которые
+       меняют данные, чтение пользователем сразу после его изменений,
+       команды управления и фоновые задачи. Если реплика недоступна,
+       чтение идет в основную БД."""
+
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        if routing is None or model._meta.label_lower in PRIMARY_READ_MODELS:
+            return DEFAULT_DB_ALIAS
+        return routing.get_read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Реплики содержат те же данные, что и основная БД."""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Миграции применяются только к основной БД, реплики получают
+           изменения репликацией."""
+        return db == DEFAULT_DB_ALIAS
@@ -28,6 +28,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ProfilingMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.DatabaseRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,16 +66,72 @@ WSGI_APPLICATION = 'foodgram.wsgi.application'
 DATABASES = {
     'default': {
         # Меняем настройку Django: теперь для работы будет использоваться
-        # бэкенд postgresql
-        'ENGINE': 'django.db.backends.postgresql',
+        # бэкенд postgresql (с проверкой соединений и пулом, см.
+        # foodgram/db/postgresql/base.py)
+        'ENGINE': 'foodgram.db.postgresql',
         'NAME': os.getenv('POSTGRES_DB', 'foodgram'),
         'USER': os.getenv('POSTGRES_USER', 'foodgram_user'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Время жизни соединения в секундах, 0 - новое соединение на
+        # каждый запрос
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # Проверка соединения перед первым запросом в каждом запросе к API
+        'CONN_HEALTH_CHECKS': (
+            os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'),
+        # Кол-во свободных соединений в пуле процесса, 0 - без пула
+        'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', 0)),
+        # Для PgBouncer в режиме пула транзакций
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True'),
     }
 }
 
+# Реплики PostgreSQL только для чтения: адреса host:port через запятую.
+# GET-запросы к API читают данные из реплик (foodgram/db_router.py),
+# запись и чтение при изменении данных - в основной БД.
+# DATABASE_REPLICAS - псевдонимы реплик в DATABASES
+DATABASE_REPLICAS = []
+for number, address in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        # В тестах реплика - та же БД, что и основная
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+# Сколько секунд после изменения данных пользователем его запросы читают
+# из основной БД: реплика может отставать и еще не содержать изменений
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Кэш справочных данных (теги, ингредиенты), версий рецептов и отметок
+# о записи для реплик общий для всех процессов: Redis (сервис redis в
+# docker-compose.yml). Кэш в памяти процесса (LocMemCache) подходит
+# только для одного процесса: изменения, сделанные в другом процессе или
+# командой управления, в нем не видны до истечения
+# REFERENCE_CACHE_TIMEOUT, поэтому с ним задавайте короткий таймаут
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reference': {
+        'BACKEND': os.getenv(
+            'REFERENCE_CACHE_BACKEND', 'django_redis.cache.RedisCache'),
+        'LOCATION': os.getenv(
+            'REFERENCE_CACHE_LOCATION', 'redis://redis:6379/1'),
+        'TIMEOUT': int(os.getenv('REFERENCE_CACHE_TIMEOUT', 60 * 60 * 24)),
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -110,6 +169,8 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = '/static/static/'
+# При collectstatic рядом с файлами сохраняются их сжатые копии
+STATICFILES_STORAGE = 'api.storage.PrecompressedStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -123,6 +184,18 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.TokenAuthentication",
     ],
 
+    # JSON через orjson, без него - стандартный модуль json
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.'
     'PageNumberPagination',
     'PAGE_SIZE': 6,
@@ -147,3 +220,58 @@ DJOSER = {
 AUTH_USER_MODEL = 'users.User'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Шрифт с поддержкой кириллицы для выгрузки списка покупок в PDF
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+# Кол-во фоновых потоков для построения вариантов картинок рецептов,
+# 0 - варианты строятся сразу после сохранения рецепта
+IMAGE_PIPELINE_WORKERS = int(os.getenv('IMAGE_PIPELINE_WORKERS', 2))
+
+# Кэш сериализованных рецептов: кол-во записей в памяти каждого процесса
+# (0 - без кэша в памяти) и необязательный общий для всех процессов кэш -
+# имя кэша из CACHES (например, reference)
+RECIPE_FRAGMENTS_CACHE_SIZE = int(
+    os.getenv('RECIPE_FRAGMENTS_CACHE_SIZE', 2000))
+RECIPE_FRAGMENTS_SHARED_CACHE = os.getenv('RECIPE_FRAGMENTS_SHARED_CACHE',
+                                          '')
+
+# Сжатие ответов API в приложении (gzip, brotli при установленном пакете
+# Brotli). False - ответы сжимает nginx (gzip_proxied в nginx.conf)
+RESPONSE_COMPRESSION = os.getenv('RESPONSE_COMPRESSION', 'True') == 'True'
+
+# Асинхронные представления для чтения тегов, ингредиентов и рецепта под
+# ASGI (воркеры uvicorn, см. gunicorn.conf.py). Под WSGI не нужны
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+
+# Профилирование запросов к API: заголовок Server-Timing и метрики /metrics
+PROFILING = os.getenv('PROFILING', 'True') == 'True'
+
+# Лимиты кол-ва SQL-запросов по действиям API. При превышении в лог
+# пишется предупреждение (log) или выбрасывается исключение (raise).
+# Значения - кол-во запросов, измеренное api/tests/test_query_budgets.py
+# с авторизацией по токену и пустыми кэшами (в тестах каждая транзакция
+# добавляет 2 запроса SAVEPOINT/RELEASE)
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'log')
+QUERY_BUDGETS = {
+    'RecipesViewSet.list': 9,
+    'RecipesViewSet.retrieve': 5,
+    'RecipesViewSet.create': 17,
+    'RecipesViewSet.partial_update': 20,
+    'RecipesViewSet.destroy': 11,
+    'RecipesViewSet.favorite': 6,
+    'RecipesViewSet.shopping_cart': 5,
+    'RecipesViewSet.download_shopping_cart': 2,
+    'RecipesViewSet.pantry': 3,
+    'RecipesViewSet.recommendations': 10,
+    'CustomUserViewSet.list': 3,
+    'CustomUserViewSet.retrieve': 2,
+    'CustomUserViewSet.me': 2,
+    'CustomUserViewSet.subscriptions': 4,
+    'CustomUserViewSet.subscribe': 8,
+    'TagsViewSet.list': 1,
+    'IngredientsViewSet.list': 2,
+}
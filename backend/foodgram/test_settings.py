@@ -0,0 +1,37 @@
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+# Настройки для тестов: python manage.py test --settings=foodgram.test_settings
+# SQLite вместо PostgreSQL и кэш в памяти процесса вместо Redis
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+    },
+    # Отдельная БД для тестов чтения из реплики (api/tests/test_db_router.py).
+    # Таблицы и данные в нее копируются из основной БД в самом тесте, в
+    # остальных тестах реплик нет (DATABASE_REPLICAS)
+    'replica_0': {
+        'ENGINE': 'django.db.backends.sqlite3',
+    },
+}
+
+CACHES = {
+    **CACHES,
+    'reference': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'reference',
+    },
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram-test-media-')
+
+# Варианты картинок строятся сразу, без фоновых потоков
+IMAGE_PIPELINE_WORKERS = 0
+
+# Превышение лимитов кол-ва SQL-запросов - ошибка
+QUERY_BUDGET_MODE = 'raise'
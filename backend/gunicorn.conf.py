@@ -0,0 +1,71 @@
+"""Настройки gunicorn. Все параметры задаются переменными окружения:
+
+   GUNICORN_WORKER_CLASS - режим воркеров:
+       gthread (по умолчанию) - WSGI, несколько потоков в каждом воркере;
+       uvicorn - ASGI (foodgram.asgi), чтение тегов, ингредиентов и
+           рецепта выполняется асинхронными представлениями;
+       sync - WSGI, один запрос на воркер за раз.
+   GUNICORN_WORKERS, GUNICORN_THREADS - кол-во воркеров и потоков в
+       воркере, по умолчанию считаются от кол-ва доступных процессоров.
+"""
+import os
+
+
+def get_cpu_count():
+    """Кол-во процессоров, доступных процессу (с учетом cpuset
+       контейнера)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+mode = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+if mode not in WORKER_CLASSES:
+    raise ValueError(f'GUNICORN_WORKER_CLASS: неизвестный режим {mode}, '
+                     f'допустимые: {", ".join(WORKER_CLASSES)}')
+cpu_count = get_cpu_count()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = WORKER_CLASSES[mode]
+# Синхронный воркер простаивает, пока ждет БД, поэтому их нужно больше,
+# чем процессоров. Воркеры gthread и uvicorn обслуживают несколько
+# запросов одновременно, им достаточно воркера на процессор.
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', cpu_count * 2 + 1 if mode == 'sync' else cpu_count + 1
+))
+threads = int(os.getenv('GUNICORN_THREADS', 4)) if mode == 'gthread' else 1
+if mode == 'uvicorn':
+    wsgi_app = 'foodgram.asgi:application'
+    raw_env = [
+        f'ASYNC_READ_VIEWS={os.getenv("ASYNC_READ_VIEWS", "True")}',
+    ]
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+
+# Соединения от nginx переиспользуются (upstream keepalive в nginx.conf),
+# поэтому таймаут keep-alive должен быть больше, чем у nginx.
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 75))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# Воркеры перезапускаются после max_requests запросов (защита от утечек
+# памяти), разброс не дает всем воркерам перезапуститься одновременно.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+# Приложение загружается до fork: воркеры стартуют быстрее и делят память
+# с главным процессом. Соединения с БД и индексы в памяти создаются
+# лениво, уже в воркерах.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+# Файлы heartbeat воркеров в памяти, а не на overlay-диске контейнера.
+worker_tmp_dir = os.getenv(
+    'GUNICORN_WORKER_TMP_DIR',
+    '/dev/shm' if os.path.isdir('/dev/shm') else None
+)
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
@@ -90,6 +90,7 @@ class RecipeAdmin(admin.ModelAdmin):
         'author',
         'get_tags',
         'get_ingredients',
+        'favorites_count',
     )
     search_fields = ('name',)
     list_filter = ('name',)
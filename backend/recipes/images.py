@@ -0,0 +1,145 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+
+from foodgram.constants import (RECIPE_IMAGE_QUALITY, RECIPE_IMAGE_VARIANTS,
+                                RECIPE_IMAGE_WEBP_QUALITY)
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    """Пул фоновых потоков, создается при первом обращении, чтобы не
+       запускать потоки до форка воркеров gunicorn."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PIPELINE_WORKERS,
+            thread_name_prefix='recipe-images')
+    return _executor
+
+
+def get_variant_name(source_name, variant, extension):
+    """Имя файла варианта картинки рядом с исходным файлом."""
+    directory, filename = os.path.split(source_name)
+    stem, _ = os.path.splitext(filename)
+    return os.path.join(directory, 'variants',
+                        f'{stem}_{variant}.{extension}')
+
+
+def save_image(image, name, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def build_variants(source_name):
+    """Строит уменьшенные копии картинки и их версии в WebP.
+       Возвращает словарь с именами сохраненных файлов."""
+    with default_storage.open(source_name) as file:
+        image = Image.open(file)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    has_alpha = 'A' in image.getbands()
+    if has_alpha:
+        image = image.convert('RGBA')
+        extension, image_format, options = 'png', 'PNG', {'optimize': True}
+    else:
+        image = image.convert('RGB')
+        extension, image_format, options = 'jpg', 'JPEG', {
+            'quality': RECIPE_IMAGE_QUALITY, 'optimize': True}
+    variants = {
+        'source': source_name,
+        'original': {
+            'default': source_name,
+            'webp': save_image(
+                image, get_variant_name(source_name, 'original', 'webp'),
+                'WEBP', quality=RECIPE_IMAGE_WEBP_QUALITY),
+        },
+    }
+    for variant, size in RECIPE_IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        variants[variant] = {
+            'default': save_image(
+                resized, get_variant_name(source_name, variant, extension),
+                image_format, **options),
+            'webp': save_image(
+                resized, get_variant_name(source_name, variant, 'webp'),
+                'WEBP', quality=RECIPE_IMAGE_WEBP_QUALITY),
+        }
+    return variants
+
+
+def get_variant_files(variants):
+    return [
+        name for variant, names in variants.items() if variant != 'source'
+        for name in names.values() if name != variants['source']
+    ]
+
+
+def delete_files(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def process_recipe_image(recipe_id, source_name):
+    """Построение вариантов картинки рецепта и сохранение их в рецепте.
+       Если картинка рецепта успела смениться, результат удаляется."""
+    from .models import Recipe, get_version_changes
+
+    try:
+        previous = Recipe.objects.filter(
+            pk=recipe_id).values_list('image_variants', flat=True).first()
+        variants = build_variants(source_name)
+        updated = Recipe.objects.filter(
+            pk=recipe_id, image=source_name).update(
+                image_variants=variants, **get_version_changes())
+        if not updated:
+            delete_files(get_variant_files(variants))
+        elif previous:
+            delete_files(get_variant_files(previous))
+    except Exception:
+        logger.exception('Не удалось обработать картинку рецепта %s',
+                         recipe_id)
+
+
+def process_in_background(recipe_id, source_name):
+    """Обработка в фоновом потоке со своим подключением к БД."""
+    close_old_connections()
+    try:
+        process_recipe_image(recipe_id, source_name)
+    finally:
+        close_old_connections()
+
+
+def schedule_recipe_image(recipe_id, source_name):
+    """Запуск обработки картинки рецепта в фоновом потоке."""
+    if settings.IMAGE_PIPELINE_WORKERS:
+        get_executor().submit(process_in_background, recipe_id, source_name)
+    else:
+        process_recipe_image(recipe_id, source_name)
+
+
+def get_image_url(recipe, variant='thumbnail', image_format='default',
+                  request=None):
+    """Ссылка на вариант картинки рецепта. Пока варианты не построены,
+       возвращается ссылка на исходную картинку."""
+    if not recipe.image:
+        return None
+    name = None
+    if recipe.image_variants.get('source') == recipe.image.name:
+        name = recipe.image_variants.get(variant, {}).get(image_format)
+    url = default_storage.url(name) if name else recipe.image.url
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import RecipeImageUpload
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки, загруженные файлом, но так и не '
+            'привязанные к рецепту.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=24,
+            help='Удалять загрузки старше указанного кол-ва часов.')
+
+    def handle(self, *args, **options):
+        uploads = RecipeImageUpload.objects.filter(
+            created__lt=timezone.now() - timedelta(hours=options['hours']))
+        deleted = 0
+        for upload in uploads.iterator():
+            upload.image.delete(save=False)
+            upload.delete()
+            deleted += 1
+        self.stdout.write(f'Удалено загрузок: {deleted}')
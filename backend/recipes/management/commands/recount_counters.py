@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import FavoriteRecipes, Recipe, get_version_changes
+from users.models import Subscribers, User
+
+
+def count_subquery(model, field):
+    """Подзапрос с кол-вом записей модели, ссылающихся на объект."""
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoriteRecipes, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscribers, 'author'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счетчики избранного, рецептов и подписчиков '
+            'и исправляет расхождения с фактическими данными.')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for model, field, related_model, related_field in COUNTERS:
+            actual = count_subquery(related_model, related_field)
+            drifted = model.objects.annotate(actual=actual).filter(
+                ~Q(**{field: F('actual')})
+            ).values('pk')
+            changes = get_version_changes() if model is Recipe else {}
+            repaired = model.objects.filter(pk__in=drifted).update(
+                **{field: actual}, **changes)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}.{field}: '
+                f'исправлено записей - {repaired}')
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+CREATE_INDEX_SQL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;"
+    "CREATE INDEX IF NOT EXISTS recipes_ingredient_search_trgm "
+    "ON recipes_ingredient "
+    "USING gin (replace(lower(name), 'ё', 'е') gin_trgm_ops);"
+)
+DROP_INDEX_SQL = "DROP INDEX IF EXISTS recipes_ingredient_search_trgm;"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_INDEX_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
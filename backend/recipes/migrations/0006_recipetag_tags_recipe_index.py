@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-18 05:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_pub_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipetag',
+            index=models.Index(fields=['tags', 'recipe'], name='recipetag_tags_recipe_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.2.3 on 2026-10-18 05:10
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+UPDATE_SEARCH_VECTOR_SQL = """
+UPDATE recipes_recipe SET search_vector =
+    setweight(to_tsvector('russian', translate(
+        recipes_recipe.name, 'Ёё', 'Ее')), 'A')
+    || setweight(to_tsvector('russian', translate(coalesce((
+        SELECT string_agg(tag.name, ' ')
+        FROM recipes_recipetag recipe_tag
+        JOIN recipes_tag tag ON tag.id = recipe_tag.tags_id
+        WHERE recipe_tag.recipe_id = recipes_recipe.id), ''),
+        'Ёё', 'Ее')), 'B')
+    || setweight(to_tsvector('russian', translate(coalesce((
+        SELECT string_agg(ingredient.name, ' ')
+        FROM recipes_recipeingredient recipe_ingredient
+        JOIN recipes_ingredient ingredient
+            ON ingredient.id = recipe_ingredient.ingredients_id
+        WHERE recipe_ingredient.recipe_id = recipes_recipe.id), ''),
+        'Ёё', 'Ее')), 'B')
+    || setweight(to_tsvector('russian', translate(
+        recipes_recipe.text, 'Ёё', 'Ее')), 'C');
+"""
+CREATE_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_gin "
+    "ON recipes_recipe USING gin (search_vector);"
+)
+DROP_INDEX_SQL = "DROP INDEX IF EXISTS recipes_recipe_search_vector_gin;"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(UPDATE_SEARCH_VECTOR_SQL)
+        schema_editor.execute(CREATE_INDEX_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipeimageupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def make_pub_dates_distinct(apps, schema_editor):
+    """Рецептам с одинаковой датой публикации (добавленным до появления
+       поля в 0005) - разные даты в порядке id: курсорная пагинация
+       выбирает страницы по дате, на повторах она переходит на OFFSET."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    duplicates = (
+        Recipe.objects.values('pub_date')
+        .annotate(recipes_count=Count('id'))
+        .filter(recipes_count__gt=1)
+        .values_list('pub_date', flat=True)
+    )
+    for pub_date in list(duplicates):
+        recipes = list(Recipe.objects.filter(
+            pub_date=pub_date).order_by('id').only('id', 'pub_date'))
+        for number, recipe in enumerate(recipes):
+            recipe.pub_date = pub_date + timedelta(microseconds=number)
+        Recipe.objects.bulk_update(recipes, ['pub_date'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(make_pub_dates_distinct,
+                             migrations.RunPython.noop),
+    ]
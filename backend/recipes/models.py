@@ -1,8 +1,10 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.utils import timezone
 
 from foodgram.constants import REGEX_COLOR, TEXT_MAX_LENGTH
-from users.models import User
+from users.models import Subscribers, User
 
 
 class Tag(models.Model):
@@ -65,6 +67,62 @@ class Ingredient(models.Model):
         return self.name
 
 
+def get_version_changes():
+    """Поля для UPDATE рецептов, меняющего их представление в API:
+       следующая версия и время изменения (для ETag/Last-Modified)."""
+    return {'version': models.F('version') + 1, 'modified_at': timezone.now()}
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов для модели рецепта."""
+
+    def with_related(self):
+        """Подгружает автора, теги и ингредиенты рецептов фиксированным
+           числом запросов, независимо от кол-ва рецептов."""
+        return self.select_related('author').defer(
+            'search_vector'
+        ).prefetch_related(
+            models.Prefetch('tags', queryset=Tag.objects.all()),
+            models.Prefetch(
+                'recipeingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredients')),
+        )
+
+    def latest_per_author(self, limit):
+        """Не более limit последних рецептов каждого автора. Выборка для
+           всех авторов выполняется одним запросом."""
+        return self.filter(pk__in=models.Subquery(
+            Recipe.objects.filter(
+                author=models.OuterRef('author')
+            ).order_by('-id').values('pk')[:limit]
+        )).order_by('-id')
+
+    def with_user_flags(self, user):
+        """Добавляет к рецептам признаки избранного, списка покупок и
+           подписки текущего пользователя на автора одним запросом."""
+        if not user.is_authenticated:
+            return self.annotate(
+                user_favorited=models.Value(
+                    False, output_field=models.BooleanField()),
+                user_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()),
+                user_subscribed=models.Value(
+                    False, output_field=models.BooleanField()),
+            )
+        return self.annotate(
+            user_favorited=models.Exists(FavoriteRecipes.objects.filter(
+                recipe=models.OuterRef('pk'),
+                user=user)),
+            user_in_shopping_cart=models.Exists(ShoppingCart.objects.filter(
+                recipe=models.OuterRef('pk'),
+                user=user)),
+            user_subscribed=models.Exists(Subscribers.objects.filter(
+                author=models.OuterRef('author'),
+                user=user)),
+        )
+
+
 class Recipe(models.Model):
     """Модель рецепта."""
     author = models.ForeignKey(
@@ -101,6 +159,11 @@ class Recipe(models.Model):
         help_text='Укажите изображение рецепта',
         upload_to='recipes_images'
     )
+    image_variants = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name='Варианты изображения'
+    )
     name = models.CharField(
         max_length=TEXT_MAX_LENGTH,
         verbose_name='Название рецепта',
@@ -117,16 +180,71 @@ class Recipe(models.Model):
         verbose_name='Время приготовления',
         help_text='Укажите время приготовления, от 1 мин'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Кол-во добавлений в избранное'
+    )
+    pub_date = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата публикации'
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name='Версия'
+    )
+    modified_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('name',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [models.Index(
+            fields=['-pub_date', '-id'],
+            name='recipe_pub_date_id_idx'
+        )]
 
     def __str__(self):
         return self.name
 
 
+class RecipeImageUpload(models.Model):
+    """Модель картинки, загруженной файлом до создания рецепта."""
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='image_uploads',
+        verbose_name='Автор загрузки',
+    )
+    image = models.ImageField(
+        verbose_name='Изображение рецепта',
+        upload_to='recipes_images'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата загрузки'
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Загруженное изображение'
+        verbose_name_plural = 'Загруженные изображения'
+
+    def __str__(self):
+        return self.image.name
+
+
 class RecipeTag(models.Model):
     """Вспомогательная модель: Тег - рецепта."""
     recipe = models.ForeignKey(
@@ -152,6 +270,10 @@ class RecipeTag(models.Model):
             fields=['recipe', 'tags'],
             name='unique_recipe_tags'
         )]
+        indexes = [models.Index(
+            fields=['tags', 'recipe'],
+            name='recipetag_tags_recipe_idx'
+        )]
 
     def __str__(self):
         return f"{self.recipe} - {self.tags}"
@@ -253,3 +375,36 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f"{self.recipe} - {self.user}"
+
+
+class RecipeNeighbor(models.Model):
+    """Модель похожего рецепта для рекомендаций. Таблица строится
+       командой build_recommendations: для каждого рецепта хранятся
+       несколько наиболее похожих с их оценкой сходства."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbors',
+        verbose_name='Рецепт'
+    )
+    neighbor = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Оценка сходства'
+    )
+
+    class Meta:
+        ordering = ('recipe', '-score')
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [models.UniqueConstraint(
+            fields=['recipe', 'neighbor'],
+            name='unique_recipe_neighbor'
+        )]
+
+    def __str__(self):
+        return f'{self.recipe} - {self.neighbor}: {self.score:.3f}'
@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import Subscribers, User
+from .images import schedule_recipe_image
+from .models import FavoriteRecipes, Recipe, get_version_changes
+
+# Поля пользователя, которые входят в представление рецептов его автора.
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def change_counter(queryset, field, delta, **changes):
+    """Изменение счетчика F-выражением, без чтения значения из БД.
+       В changes - другие поля, обновляемые тем же запросом."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gt': 0})
+    queryset.update(**{field: F(field) + delta}, **changes)
+
+
+@receiver(post_save, sender=FavoriteRecipes)
+def increase_favorites_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                       'favorites_count', 1, **get_version_changes())
+
+
+@receiver(post_delete, sender=FavoriteRecipes)
+def decrease_favorites_count(sender, instance, **kwargs):
+    change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                   'favorites_count', -1, **get_version_changes())
+
+
+@receiver(post_save, sender=Recipe)
+def increase_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User.objects.filter(pk=instance.author_id),
+                       'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrease_recipes_count(sender, instance, **kwargs):
+    change_counter(User.objects.filter(pk=instance.author_id),
+                   'recipes_count', -1)
+
+
+@receiver(post_save, sender=User)
+def change_author_recipes_version(sender, instance, created, update_fields,
+                                  **kwargs):
+    """Новая версия рецептов автора при изменении полей профиля, которые
+       входят в рецепты: меняются ключи кэша рецептов и ETag ответов.
+       Сохранение без изменения этих полей версию не меняет."""
+    if created:
+        return
+    fields = (AUTHOR_FIELDS if update_fields is None
+              else AUTHOR_FIELDS.intersection(update_fields))
+    if instance.get_changed_fields(fields):
+        Recipe.objects.filter(author=instance).update(
+            **get_version_changes())
+
+
+@receiver(post_save, sender=Subscribers)
+def increase_subscribers_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User.objects.filter(pk=instance.author_id),
+                       'subscribers_count', 1)
+
+
+@receiver(post_delete, sender=Subscribers)
+def decrease_subscribers_count(sender, instance, **kwargs):
+    change_counter(User.objects.filter(pk=instance.author_id),
+                   'subscribers_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    """Построение вариантов новой картинки рецепта после сохранения."""
+    source_name = instance.image.name
+    if source_name and instance.image_variants.get('source') != source_name:
+        transaction.on_commit(
+            lambda: schedule_recipe_image(instance.pk, source_name))
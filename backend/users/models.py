@@ -36,6 +36,16 @@ class User(AbstractUser):
         verbose_name='E-mail пользователя',
         help_text='Укажите e-mail пользователя'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Кол-во рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Кол-во подписчиков'
+    )
 
     class Meta:
         ordering = ('username',)
@@ -45,6 +55,22 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Значения полей, загруженные из БД, сохраняются для проверки
+           изменившихся полей при сохранении (get_changed_fields)."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_changed_fields(self, fields):
+        """Поля из fields, значения которых отличаются от загруженных из
+           БД. Для пользователя, не загруженного из БД, - все поля."""
+        loaded_values = getattr(self, '_loaded_values', {})
+        return {field for field in fields
+                if field not in loaded_values
+                or loaded_values[field] != getattr(self, field)}
+
 
 class Subscribers(models.Model):
     """Модель подписок на автора рецепта."""